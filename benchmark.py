@@ -0,0 +1,137 @@
+"""Time the per-frame star projection and culling against the worker count.
+
+    python benchmark.py [--stars 2000000] [--repeat 5] [--workers 1 2 4 8] [--check]
+
+A synthetic uniform sky of `--stars` stars is culled and projected with the
+StarMap code paths (StarMap._on_screen and StarMap.project) for each worker
+count. Every run is checked to give exactly the single-threaded result.
+
+With --check, the compiled kernels (kernels.py, when Numba is installed) are
+first compared against their NumPy implementations on the same sky.
+"""
+import argparse
+import os
+import time
+import sys
+import numpy as np
+
+import kernels
+from parallel import ChunkPool
+from projection import PROJECTIONS
+from star_projection import StarMap
+
+
+def synthetic_sky(n, seed=0):
+    """RA/Dec of `n` stars spread uniformly over the sphere, as float32 like the catalog"""
+    rng = np.random.default_rng(seed)
+    ras = rng.uniform(0, 360, n).astype(np.float32)
+    decs = np.degrees(np.arcsin(rng.uniform(-1, 1, n))).astype(np.float32)
+    return ras, decs
+
+
+def frame(star_map, ras, decs):
+    """The array work of one frame: the visibility cull, then projecting the survivors"""
+    mask = star_map._on_screen(ras, decs, star_map.view_ra, star_map.view_dec)
+    return mask, star_map.project(ras[mask], decs[mask])
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def check_kernels(star_map, ras, decs):
+    """Compare every compiled kernel with its NumPy implementation; True when all agree"""
+    if not kernels.HAVE_NUMBA:
+        print('Numba is not installed: only the NumPy kernels are in use, nothing to compare')
+        return True
+    ok = True
+
+    def report(name, passed, detail=''):
+        nonlocal ok
+        ok &= bool(passed)
+        print(f'{name:<32} {"ok" if passed else "MISMATCH"} {detail}')
+
+    # Projection and cull: the compiled loop works in float64 throughout, NumPy keeps the
+    # catalog's float32, so positions agree to float32 precision and masks exactly
+    scale_inv = 1 / star_map.min_scale
+    tolerance = dict(rtol=kernels.PROJECT_RTOL, atol=kernels.PROJECT_ATOL_DEG * scale_inv)
+    for name, projection in PROJECTIONS.items():
+        for horizon in (False, True):
+            args = (projection, ras, decs, 123.4, -20.5, scale_inv, horizon)
+            x0, y0, visible0 = kernels.project(*args, jit=False)
+            x1, y1, visible1 = kernels.project(*args, jit=True)
+            error = max(np.abs(x0 - x1).max(), np.abs(y0 - y1).max())
+            report(f'project {name}{" horizon" if horizon else ""}',
+                   np.array_equal(visible0, visible1) and np.allclose(x0, x1, **tolerance)
+                   and np.allclose(y0, y1, **tolerance), f'max error {error:.2g} px')
+
+    # Segment splitting on the real asterisms and on random polylines
+    x, _, visible = star_map.screen_layer('asterisms')
+    layers = [('asterisms', x, visible, star_map.asterisms.offsets)]
+    rng = np.random.default_rng(1)
+    lengths = rng.integers(0, 12, 20000)
+    layers.append(('random polylines', rng.uniform(0, 1600, lengths.sum()), rng.random(lengths.sum()) < 0.9,
+                   np.r_[0, np.cumsum(lengths)]))
+    for name, x, visible, offsets in layers:
+        runs0 = kernels.split_runs(x, visible, offsets, 960, jit=False)
+        runs1 = kernels.split_runs(x, visible, offsets, 960, jit=True)
+        report(f'split_runs {name}', all(np.array_equal(a, b) for a, b in zip(runs0, runs1)),
+               f'{len(runs0[0])} runs')
+
+    # Splatting: integer arithmetic, so pixel buffers must match exactly
+    n = 20000
+    stars = (rng.integers(-5, 1205, n), rng.integers(-5, 605, n), rng.integers(1, 6, n),
+             rng.integers(0, 256, (n, 3)), rng.uniform(0.1, 1, n))
+    base = rng.integers(0, 200, (1200, 600, 3)).astype(np.uint8)
+    pixels0, pixels1 = base.copy(), base.copy()
+    kernels.splat(pixels0, *stars, jit=False)
+    kernels.splat(pixels1, *stars, jit=True)
+    report('splat', np.array_equal(pixels0, pixels1), f'{n} stars')
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stars', type=int, default=2_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, 8, os.cpu_count() or 1}))
+    parser.add_argument('--projection', choices=list(PROJECTIONS), default='stereographic')
+    parser.add_argument('--check', action='store_true', help='compare compiled and NumPy kernels first')
+    args = parser.parse_args()
+
+    ras, decs = synthetic_sky(args.stars)
+    star_map = StarMap()
+    star_map.set_projection(args.projection)
+    # Zoomed out far enough that a good share of the sky is on screen
+    star_map.set_view(ra=120, dec=20, scale=star_map.min_scale)
+    if args.check and not check_kernels(star_map, ras, decs):
+        sys.exit(1)
+    backend = 'numba' if kernels.JIT else 'numpy'
+    print(f'{args.stars} stars, {args.projection}, {backend} kernels, {os.cpu_count()} CPUs')
+    print(f'{"workers":>8} {"ms/frame":>10} {"speedup":>8}')
+
+    reference = None
+    serial = None
+    for workers in args.workers:
+        star_map.pool = ChunkPool(workers)
+        elapsed, result = best_time(lambda: frame(star_map, ras, decs), args.repeat)
+        star_map.pool.shutdown()
+        mask, (x, y, visible) = result
+        if reference is None:
+            reference, serial = result, elapsed
+        else:
+            ref_mask, (ref_x, ref_y, ref_visible) = reference
+            assert np.array_equal(mask, ref_mask), f'cull differs with {workers} workers'
+            assert np.array_equal(x, ref_x) and np.array_equal(y, ref_y), f'projection differs with {workers} workers'
+            assert np.array_equal(visible, ref_visible)
+        print(f'{workers:>8} {elapsed * 1000:>10.1f} {serial / elapsed:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Rebuild the runtime star catalog from an upstream HYG dump.
+
+    python build_catalog.py hyg_v38.csv.gz --output stars.csv --mag-limit 6.5 [--partition DIR]
+
+The gzipped source is streamed in blocks of lines that worker processes parse
+and filter in parallel; only a bounded number of blocks is in flight at once.
+Stars referenced by constellationship.fab are kept even when fainter than the
+cut, so every asterism line resolves. When it is written to the viewer's
+STAR_FILE, the filtered CSV is then compiled into the binary caches used at
+runtime (stars, asterism and boundary geometry). It can also be written out as
+a sky-partitioned catalog.
+
+The output only has the upstream HYG columns. The bundled STAR_FILE also
+carries columns derived elsewhere (greek_letters, spect_desig, color,
+linecolor) that the trial notebooks read, so --output has no default: writing
+over STAR_FILE has to be asked for by name.
+"""
+import argparse
+import gzip
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from geometry import iter_constellationship
+from load_data import STAR_FILE, ASTERISM_FAB, load_stars, loadData
+from partition import build_partitioned_catalog
+
+
+def _open_source(path):
+    return gzip.open(path, mode='rt', encoding='utf-8') if path.endswith('.gz') else open(path, encoding='utf-8')
+
+
+def _read_blocks(f, lines_per_block):
+    while True:
+        block = list(islice(f, lines_per_block))
+        if not block:
+            return
+        yield ''.join(block)
+
+
+def _parse_block(header, block, mag_limit, keep_hips):
+    """Worker: parse one block of CSV lines and return the kept rows as CSV text"""
+    import pandas as pd
+    stars = pd.read_csv(io.StringIO(header + block), low_memory=False)
+    keep = (stars['mag'] <= mag_limit) | stars['hip'].isin(keep_hips)
+    # The Sun sits in HYG as row 0 and has no place on a star chart
+    keep &= stars['id'] != 0
+    stars = stars[keep]
+    return len(stars), stars.to_csv(header=False, index=False)
+
+
+def build(source, output, mag_limit, fab=ASTERISM_FAB, workers=None, lines_per_block=20000):
+    """Stream `source` into a filtered CSV at `output`; returns (rows read, rows kept)"""
+    keep_hips = sorted({hip for _, hips in iter_constellationship(fab) for hip in hips})
+    workers = workers or os.cpu_count() or 1
+    read = kept = 0
+    tmp = output + '.tmp'
+    with _open_source(source) as f, open(tmp, 'w', encoding='utf-8') as out, \
+            ProcessPoolExecutor(workers) as pool:
+        header = f.readline()
+        out.write(header)
+        pending = deque()
+        for block in _read_blocks(f, lines_per_block):
+            read += block.count('\n')
+            pending.append(pool.submit(_parse_block, header, block, mag_limit, keep_hips))
+            # Bound memory: never hold more than two blocks per worker
+            while len(pending) >= 2 * workers:
+                count, text = pending.popleft().result()
+                kept += count
+                out.write(text)
+        while pending:
+            count, text = pending.popleft().result()
+            kept += count
+            out.write(text)
+    os.replace(tmp, output)
+    return read, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the runtime star catalog from a HYG CSV (optionally gzipped)')
+    parser.add_argument('source', help='upstream HYG file, e.g. hyg_v38.csv.gz')
+    parser.add_argument('--mag-limit', type=float, default=6.5, help='faintest magnitude kept (default 6.5)')
+    parser.add_argument('--output', required=True,
+                        help=f'filtered star CSV; {STAR_FILE} is what the viewer loads, but it carries '
+                             'extra derived columns an upstream dump does not have')
+    parser.add_argument('--fab', default=ASTERISM_FAB, help='constellationship.fab whose stars are always kept')
+    parser.add_argument('--workers', type=int, default=None, help='parser processes (default: all cores)')
+    parser.add_argument('--block-lines', type=int, default=20000, help='source lines per parse block')
+    parser.add_argument('--partition', metavar='DIR', help='also write a sky-partitioned catalog to DIR')
+    parser.add_argument('--cell-deg', type=float, default=15, help='partition cell size in degrees')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    read, kept = build(args.source, args.output, args.mag_limit, args.fab, args.workers, args.block_lines)
+    print(f'{kept} of {read} stars kept in {args.output} ({time.perf_counter() - start:.1f} s)')
+
+    if os.path.abspath(args.output) == os.path.abspath(STAR_FILE):
+        # Compile the binary caches the viewer loads at startup
+        loadData(columns=None, star_file=args.output)
+    else:
+        print(f'Not precompiling runtime caches: the viewer loads {STAR_FILE}, not {args.output}')
+    if args.partition:
+        meta = build_partitioned_catalog(load_stars(None, args.output), args.partition, args.cell_deg)
+        print(f"{meta['rows']} stars in {len(meta['cells'])} cells written to {args.partition}")
+    print(f'Done in {time.perf_counter() - start:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
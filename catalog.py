@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+# Bump whenever the on-disk layout or the derived columns change
+CACHE_VERSION = 5
+CACHE_DIR = './data/cache'
+META_FILE = 'meta.json'
+
+
+def file_fingerprint(path):
+    """Cheap identity of a source file: size and modification time"""
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def file_digest(path):
+    """Content hash of a source file, used when the fingerprint changed"""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_meta(directory, meta):
+    """Replace a build's meta.json in one step, so a crash never leaves it half written"""
+    path = os.path.join(directory, META_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def cached_derived(meta, directory, key, compute):
+    """Summary value `key` of a table, computed once and kept in its metadata
+
+    `compute` must return something JSON serialisable. With a cache directory the
+    value is written back to meta.json, so it survives restarts until the table
+    is rebuilt (a rebuild writes fresh metadata without it).
+    """
+    derived = meta.setdefault('derived', {})
+    if key not in derived:
+        derived[key] = compute()
+        if directory is not None:
+            try:
+                _write_meta(directory, meta)
+            except OSError:
+                pass  # Read-only cache: keep the value for this run only
+    return derived[key]
+
+
+class StarCatalog:
+    """Column store of equally sized NumPy arrays, optionally memory-mapped from a cache directory"""
+    def __init__(self, columns, meta=None, directory=None):
+        self._columns = dict(columns)
+        self.meta = meta or {}
+        self.directory = directory
+
+    @property
+    def columns(self):
+        if 'columns' in self.meta:
+            return list(self.meta['columns'])
+        return list(self._columns)
+
+    def __contains__(self, name):
+        return name in self._columns or name in self.meta.get('columns', ())
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            if self.directory is None or name not in self.meta.get('columns', ()):
+                raise KeyError(name)
+            self._columns[name] = np.load(os.path.join(self.directory, name + '.npy'), mmap_mode='r')
+        return self._columns[name]
+
+    def __len__(self):
+        if 'rows' in self.meta:
+            return self.meta['rows']
+        return len(next(iter(self._columns.values()), ()))
+
+    def derived(self, key, compute):
+        """Value of `compute()` cached in this catalog's metadata (see cached_derived)"""
+        return cached_derived(self.meta, self.directory, key, compute)
+
+    def with_columns(self, **columns):
+        """Catalog sharing this one's columns, with the given ones replaced"""
+        return StarCatalog({**self._columns, **columns}, self.meta, self.directory)
+
+    def subset(self, index):
+        """Rows selected by a boolean mask or index array, for the columns already loaded"""
+        return StarCatalog({name: col[index] for name, col in self._columns.items()})
+
+
+class StarView:
+    """Rows of a StarCatalog selected by an index array or slice, without copying the table
+
+    Columns are gathered only when asked for (a slice gives a true view), and each
+    one at most once per view.
+    """
+    def __init__(self, catalog, index):
+        self.catalog = catalog
+        self.index = index
+        self._gathered = {}
+
+    def __len__(self):
+        if isinstance(self.index, slice):
+            return len(range(*self.index.indices(len(self.catalog))))
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.catalog
+
+    def __getitem__(self, name):
+        if name not in self._gathered:
+            self._gathered[name] = self.catalog[name][self.index]
+        return self._gathered[name]
+
+
+def _write_compiled(directory, columns, meta):
+    """Write columns and metadata into a fresh directory, replacing any previous build"""
+    tmp = directory + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp, name + '.npy'), np.ascontiguousarray(values))
+    with open(os.path.join(tmp, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=1)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _source_paths(source):
+    return [source] if isinstance(source, str) else list(source)
+
+
+def _describe_sources(source):
+    return [{'path': os.path.abspath(path), 'fingerprint': file_fingerprint(path), 'sha1': file_digest(path)}
+            for path in _source_paths(source)]
+
+
+def _is_fresh(directory, meta, source):
+    """Check a compiled build against its sources, by mtime first and by hash if that moved"""
+    if meta is None or meta.get('version') != CACHE_VERSION:
+        return False
+    paths = _source_paths(source)
+    recorded = meta.get('sources', [])
+    if [os.path.abspath(path) for path in paths] != [entry['path'] for entry in recorded]:
+        return False
+    touched = False
+    for path, entry in zip(paths, recorded):
+        fingerprint = file_fingerprint(path)
+        if fingerprint == entry['fingerprint']:
+            continue
+        # Touched but possibly unchanged (checkout, copy): fall back to the content hash
+        if file_digest(path) != entry['sha1']:
+            return False
+        entry['fingerprint'] = fingerprint
+        touched = True
+    if touched:
+        _write_meta(directory, meta)
+    return True
+
+
+def load_compiled(name, source, build, columns=None, cache_dir=CACHE_DIR):
+    """Load the compiled table `name`, rebuilding it from `source` with `build` when stale
+
+    `source` is a path or a sequence of paths; the table is rebuilt when any of
+    them changes. Only `columns` are opened up front (all of them when None); the
+    rest of the table is mapped lazily the first time it is indexed.
+    """
+    directory = os.path.join(cache_dir, name)
+    meta = _read_meta(directory)
+    if not _is_fresh(directory, meta, source):
+        built = build(source)
+        meta = {
+            'version': CACHE_VERSION,
+            'sources': _describe_sources(source),
+            'rows': len(next(iter(built.values()))),
+            'columns': list(built),
+            'dtypes': {k: np.asarray(v).dtype.str for k, v in built.items()},
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_compiled(directory, built, meta)
+    catalog = StarCatalog({}, meta, directory)
+    for column in meta['columns'] if columns is None else columns:
+        catalog[column]
+    return catalog
@@ -5,4 +5,73 @@ ASTERISM_COLOR = (255, 0, 0)
 CONSTELLATION_COLOR = (0, 0, 0) 
 FONT_COLOR = (200, 200, 255)
 SELECTED_COLOR = (144, 238, 144)
-SELECTED_LINE_COLOR = (144, 238, 144)
\ No newline at end of file
+SELECTED_LINE_COLOR = (144, 238, 144)
+
+# Constellation geometry source: 'native' reads the Stellarium files (bound_20.dat,
+# constellationship.fab), 'csv' reads the preprocessed asterisms/constellations CSVs
+GEOMETRY_FORMAT = 'native'
+
+# Time-to-first-frame budget reported by the startup trace (--trace-startup)
+STARTUP_BUDGET_MS = 1500
+
+# Level of detail: faintest magnitude drawn when fully zoomed out, and how many
+# magnitudes deeper the limit goes per 10x zoom in
+LOD_MAG_ZOOMED_OUT = 5.5
+LOD_MAG_PER_DECADE = 2.5
+
+# Out-of-core catalog: directory written by partition.py (None keeps the whole catalog in memory)
+PARTITIONED_CATALOG = None
+PARTITION_MAX_CELLS = 256  # LRU bound on memory-mapped cells
+
+# Cell size of the in-memory visibility grid, and the view coverage above which
+# a plain magnitude-prefix scan is cheaper than gathering cells
+GRID_CELL_DEG = 5
+GRID_MAX_COVERAGE = 0.25
+
+# Epoch scrubbing (Left/Right arrows in the viewer): years per key press, and how many
+# propagated epochs are kept in memory
+EPOCH_STEP_YEARS = 100
+EPOCH_CACHE_SIZE = 16
+
+# Observer site for the horizon (alt-az) view, toggled with H in the viewer (Kathmandu)
+OBSERVER_LATITUDE = 27.7172
+OBSERVER_LONGITUDE = 85.3240
+
+# Sky projection at startup: equirectangular, gnomonic, stereographic or orthographic
+# (press P in the viewer to cycle)
+PROJECTION = 'equirectangular'
+
+# Incremental panning: update the visible set from the strips entering/leaving the view
+# when a pan moves it by less than this fraction of the view size (same zoom)
+INCREMENTAL_PAN = True
+PAN_MAX_SHIFT = 0.25
+
+# Threads for projecting and culling large star arrays (0 = one per core, 1 = single-threaded);
+# arrays shorter than two chunks of PARALLEL_MIN_CHUNK stars are always done inline
+PROJECTION_WORKERS = 0
+PARALLEL_MIN_CHUNK = 65536
+
+# Use Numba-compiled frame kernels (kernels.py) when Numba is installed; NumPy otherwise
+JIT_KERNELS = True
+
+# Star rasteriser: 'sprites' (pre-rendered discs, one Surface.blits per frame) or 'splat'
+# (additive discs written into the pixel buffer, brightness from magnitude); S cycles them
+STAR_RENDERER = 'sprites'
+# Star sprites: halo in pixels around each star's disc (0 draws plain discs)
+STAR_GLOW = 0
+# Splat renderer: brightness of a star at the limiting magnitude (brighter stars scale up by flux)
+SPLAT_FAINT_INTENSITY = 0.35
+
+# Constellation boundaries are drawn into an off-screen layer this many pixels larger than
+# the view on every side; pans within the margin only move it
+BOUNDARY_LAYER_MARGIN = 256
+
+# Memory cap (bytes) of the renderer's LRU of sky-space constellation line geometry
+GEOMETRY_CACHE_BYTES = 4 * 1024 * 1024
+
+# Main loop: frame rate cap while the view changes, longest idle sleep between wakeups,
+# horizon-mode sky step, and how often to print drawn vs requested frames (0 = only on exit)
+TARGET_FPS = 60
+IDLE_WAIT_MS = 1000
+HORIZON_TICK_SECONDS = 1.0
+FRAME_REPORT_SECONDS = 0
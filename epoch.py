@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import numpy as np
+from geometry import ShapeStore, hip_index
+
+# HYG positions are for epoch and equinox J2000
+CATALOG_EPOCH = 2000.0
+MAS_TO_RAD = np.pi / (180 * 3600 * 1000)
+
+
+def unit_vectors(ra_deg, dec_deg):
+    ra = np.radians(np.asarray(ra_deg, dtype=np.float64))
+    dec = np.radians(np.asarray(dec_deg, dtype=np.float64))
+    cos_dec = np.cos(dec)
+    return np.stack((cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)))
+
+
+def to_ra_dec(vectors):
+    x, y, z = vectors
+    ra = np.degrees(np.arctan2(y, x)) % 360
+    dec = np.degrees(np.arctan2(z, np.hypot(x, y)))
+    return ra, dec
+
+
+def precession_matrix(epoch, from_epoch=CATALOG_EPOCH):
+    """IAU 1976 (Lieske) precession from the J2000 equinox to the mean equinox of `epoch`"""
+    if from_epoch != CATALOG_EPOCH:
+        return precession_matrix(epoch) @ precession_matrix(from_epoch).T
+    t = (epoch - CATALOG_EPOCH) / 100
+    arcsec = np.pi / (180 * 3600)
+    zeta = (2306.2181 * t + 0.30188 * t**2 + 0.017998 * t**3) * arcsec
+    z = (2306.2181 * t + 1.09468 * t**2 + 0.018203 * t**3) * arcsec
+    theta = (2004.3109 * t - 0.42665 * t**2 - 0.041833 * t**3) * arcsec
+
+    def rot_z(a):
+        c, s = np.cos(a), np.sin(a)
+        return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+
+    def rot_y(a):
+        c, s = np.cos(a), np.sin(a)
+        return np.array([[c, 0, -s], [0, 1, 0], [s, 0, c]])
+
+    return rot_z(z) @ rot_y(theta) @ rot_z(zeta)
+
+
+def apply_proper_motion(vectors, pmra, pmdec, years):
+    """Move unit vectors along their proper motion (mas/yr, pmra including cos dec)
+
+    The motion is applied as a straight step on the sphere's tangent plane and
+    renormalised, which stays well-behaved at the poles. Radial velocity
+    (perspective acceleration) is ignored; it matters only for a handful of
+    nearby stars over many millennia.
+    """
+    x, y, z = vectors
+    rho = np.hypot(x, y)
+    safe = np.where(rho > 0, rho, 1.0)
+    # Local east and north unit vectors
+    east = np.stack((-y / safe, x / safe, np.zeros_like(x)))
+    north = np.stack((-z * x / safe, -z * y / safe, rho))
+    pmra = np.nan_to_num(np.asarray(pmra, dtype=np.float64)) * MAS_TO_RAD * years
+    pmdec = np.nan_to_num(np.asarray(pmdec, dtype=np.float64)) * MAS_TO_RAD * years
+    moved = vectors + east * pmra + north * pmdec
+    return moved / np.linalg.norm(moved, axis=0)
+
+
+def star_positions(ras, decs, pmra, pmdec, epoch):
+    """RA/Dec (degrees, mean equinox of `epoch`) of stars propagated to `epoch`"""
+    vectors = apply_proper_motion(unit_vectors(ras, decs), pmra, pmdec, epoch - CATALOG_EPOCH)
+    return to_ra_dec(precession_matrix(epoch) @ vectors)
+
+
+class EpochCache:
+    """Stars and constellation geometry propagated to a given epoch, cached per epoch (LRU)
+
+    `build_index`, if given, is called on each propagated star table and its result
+    (e.g. a spatial index) is cached alongside it.
+    """
+    def __init__(self, stars, asterisms, boundaries, max_epochs=16, build_index=None):
+        self.stars = stars
+        self.build_index = build_index
+        self.asterisms = asterisms
+        self.boundaries = boundaries
+        self.max_epochs = max_epochs
+        self._cache = OrderedDict()
+        # Asterism vertices follow the proper motion of the star they sit on
+        index = hip_index(stars['hip'])
+        rows = np.array([index.get(hip, -1) for hip in asterisms.vertex_ids.tolist()], dtype=np.int64)
+        self._vertex_rows = rows
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, epoch):
+        """(stars, asterisms, boundaries, index) for `epoch`, positions in its mean equinox"""
+        if epoch in self._cache:
+            self._cache.move_to_end(epoch)
+            self.hits += 1
+            return self._cache[epoch]
+        self.misses += 1
+        stars = self._stars_at(epoch)
+        index = self.build_index(stars) if self.build_index else None
+        result = (stars, self._asterisms_at(epoch), self._shapes_at(self.boundaries, epoch), index)
+        self._cache[epoch] = result
+        while len(self._cache) > self.max_epochs:
+            self._cache.popitem(last=False)
+        return result
+
+    def _stars_at(self, epoch):
+        stars = self.stars
+        ra, dec = star_positions(stars['ra_deg'], stars['dec'], stars['pmra'], stars['pmdec'], epoch)
+        return stars.with_columns(ra_deg=ra.astype(stars['ra_deg'].dtype), dec=dec.astype(stars['dec'].dtype))
+
+    def _asterisms_at(self, epoch):
+        rows = self._vertex_rows
+        known = rows >= 0
+        pmra = np.zeros(len(rows))
+        pmdec = np.zeros(len(rows))
+        pmra[known] = self.stars['pmra'][rows[known]]
+        pmdec[known] = self.stars['pmdec'][rows[known]]
+        store = self.asterisms
+        ra, dec = star_positions(store.ra, store.dec, pmra, pmdec, epoch)
+        return ShapeStore(store.names, store.offsets, ra, dec, store.vertex_ids, store.info)
+
+    def _shapes_at(self, store, epoch):
+        """Fixed sky outlines (boundaries) only precess"""
+        ra, dec = to_ra_dec(precession_matrix(epoch) @ unit_vectors(store.ra, store.dec))
+        return ShapeStore(store.names, store.offsets, ra, dec, store.vertex_ids, store.info)
@@ -0,0 +1,96 @@
+import time
+import pygame
+
+# Window events after which the last frame has to be drawn again
+REDRAW_EVENTS = {getattr(pygame, name) for name in
+                 ('VIDEOEXPOSE', 'WINDOWEXPOSED', 'WINDOWSHOWN', 'WINDOWRESTORED', 'WINDOWSIZECHANGED')
+                 if hasattr(pygame, name)}
+_UNSET = object()
+
+
+class FrameScheduler:
+    """Render-on-demand pacing for the main loop
+
+    A frame is drawn only when something is dirty: a tracked state (view,
+    selection, ...) changed, a window event exposed the screen, or a periodic
+    animation came due. Otherwise events() blocks in pygame.event.wait until
+    input arrives or the next animation deadline, so an idle viewer uses no CPU.
+    Frames are still capped at `fps` while something keeps changing.
+    """
+    def __init__(self, fps=60, idle_wait_ms=1000):
+        self.fps = fps
+        self.idle_wait_ms = idle_wait_ms
+        self.clock = pygame.time.Clock()
+        self.dirty = {'first frame'}
+        self._tracked = {}
+        self.animation_interval = None
+        self._next_animation = None
+        self.start = time.perf_counter()
+        self.rendered = 0
+        self.wakeups = 0
+        self.reasons = {}
+
+    def invalidate(self, reason):
+        """Mark the frame dirty"""
+        self.dirty.add(reason)
+
+    def track(self, name, state):
+        """Mark the frame dirty when `state` differs from the last value tracked under `name`"""
+        if self._tracked.get(name, _UNSET) != state:
+            self._tracked[name] = state
+            self.dirty.add(name)
+
+    def animate(self, interval):
+        """Wake and mark 'animation' dirty every `interval` seconds (None stops it)"""
+        if interval == self.animation_interval:
+            return
+        self.animation_interval = interval
+        self._next_animation = None if interval is None else time.perf_counter()
+
+    def events(self):
+        """Pending events, blocking first while nothing is dirty"""
+        if not self.dirty and not self._animation_ready():
+            timeout = self.idle_wait_ms
+            if self._next_animation is not None:
+                timeout = min(timeout, max(1, int((self._next_animation - time.perf_counter()) * 1000)))
+            # A timeout of 0 would wait forever, hence at least 1 ms
+            first = pygame.event.wait(timeout)
+            self.wakeups += 1
+            events = ([] if first.type == pygame.NOEVENT else [first]) + pygame.event.get()
+        else:
+            events = pygame.event.get()
+        if any(event.type in REDRAW_EVENTS for event in events):
+            self.dirty.add('window')
+        return events
+
+    def _animation_ready(self):
+        return self._next_animation is not None and time.perf_counter() >= self._next_animation
+
+    def animation_due(self):
+        """True (and the next deadline scheduled) when the periodic animation should step"""
+        if not self._animation_ready():
+            return False
+        self._next_animation = time.perf_counter() + self.animation_interval
+        self.dirty.add('animation')
+        return True
+
+    def frame_drawn(self):
+        """Record a rendered frame, clear the dirty state and hold the frame rate cap"""
+        self.rendered += 1
+        for reason in self.dirty:
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        self.dirty.clear()
+        self.clock.tick(self.fps)
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.start
+        return {'elapsed_s': elapsed, 'rendered': self.rendered, 'requested': int(elapsed * self.fps),
+                'wakeups': self.wakeups, 'reasons': dict(self.reasons)}
+
+    def summary(self):
+        """One line comparing frames drawn with what a fixed-rate loop would have drawn"""
+        stats = self.stats()
+        share = stats['rendered'] / max(stats['requested'], 1)
+        reasons = ', '.join(f'{name} {count}' for name, count in sorted(stats['reasons'].items()))
+        return (f"frames: {stats['rendered']} rendered of {stats['requested']} requested at {self.fps} FPS "
+                f"over {stats['elapsed_s']:.1f} s ({share:.0%}); {stats['wakeups']} idle wakeups; {reasons}")
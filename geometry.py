@@ -0,0 +1,194 @@
+import warnings
+import numpy as np
+
+# Constellations flagged as zodiacal in asterisms.csv
+ZODIAC = {'Ari', 'Tau', 'Gem', 'Cnc', 'Leo', 'Vir', 'Lib', 'Sco', 'Sgr', 'Cap', 'Aqr', 'Psc'}
+
+
+def hours_to_deg(hours):
+    return hours * 360 / 24
+
+
+def parse_list(text, dtype=float):
+    """Parse a stringified Python list such as "[1.0, 2.5]" or "['1', '2']" into an array"""
+    items = text.strip('[]').replace("'", '').replace('"', '').split(',')
+    return np.array([item for item in items if item.strip()], dtype=dtype)
+
+
+class ShapeStore:
+    """Ragged set of sky polylines: flat vertex arrays plus per-shape offsets
+
+    Shape i owns vertices offsets[i]:offsets[i+1] of `ra` and `dec` (both in degrees).
+    `vertex_ids` carries the HIP id of each vertex (-1 when unknown) and `info`
+    holds extra per-shape columns such as the constellation abbreviation.
+    """
+    def __init__(self, names, offsets, ra, dec, vertex_ids=None, info=None):
+        self.names = np.asarray(names)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.ra = np.asarray(ra, dtype=np.float64)
+        self.dec = np.asarray(dec, dtype=np.float64)
+        if vertex_ids is None:
+            vertex_ids = np.full(len(self.ra), -1, dtype=np.int64)
+        self.vertex_ids = np.asarray(vertex_ids)
+        self.info = dict(info or {})
+        self._by_name = {}
+        for i, name in enumerate(self.names.tolist()):
+            self._by_name.setdefault(name, []).append(i)
+
+    def __len__(self):
+        return len(self.names)
+
+    def bounds(self, i):
+        return self.offsets[i], self.offsets[i + 1]
+
+    def shape(self, i):
+        """RA/Dec vertex views of shape i"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.ra[start:end], self.dec[start:end]
+
+    def indices(self, name):
+        """Indices of the shapes called `name`"""
+        return self._by_name.get(name, [])
+
+    def shape_of_vertex(self, vertex):
+        """Index of the shape owning flat vertex index `vertex`"""
+        return int(np.searchsorted(self.offsets, vertex, side='right') - 1)
+
+    def to_columns(self):
+        columns = {'names': self.names, 'offsets': self.offsets, 'ra': self.ra,
+                   'dec': self.dec, 'vertex_ids': self.vertex_ids}
+        for key, values in self.info.items():
+            columns['info.' + key] = np.asarray(values)
+        return columns
+
+    @classmethod
+    def from_columns(cls, columns):
+        info = {name[5:]: columns[name] for name in columns.columns if name.startswith('info.')}
+        return cls(columns['names'], columns['offsets'], columns['ra'], columns['dec'],
+                   columns['vertex_ids'], info)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from an iterable of (name, ra_deg, dec_deg, vertex_ids, info) tuples"""
+        names, ras, decs, ids, infos = [], [], [], [], {}
+        offsets = [0]
+        for name, ra, dec, vertex_ids, extra in records:
+            names.append(name)
+            ras.append(np.asarray(ra, dtype=np.float64))
+            decs.append(np.asarray(dec, dtype=np.float64))
+            if vertex_ids is None:
+                vertex_ids = np.full(len(ras[-1]), -1, dtype=np.int64)
+            ids.append(np.asarray(vertex_ids, dtype=np.int64))
+            offsets.append(offsets[-1] + len(ras[-1]))
+            for key, value in (extra or {}).items():
+                infos.setdefault(key, []).append(value)
+        concat = lambda parts, dtype: np.concatenate(parts) if parts else np.empty(0, dtype)
+        return cls(np.array(names, dtype=str), offsets, concat(ras, np.float64),
+                   concat(decs, np.float64), concat(ids, np.int64),
+                   {key: np.array(values) for key, values in infos.items()})
+
+
+def build_asterisms(path):
+    """Parse asterisms.csv once: stringified RA (hours) / Dec / HIP lists become flat arrays"""
+    import pandas as pd
+    table = pd.read_csv(path)
+    records = []
+    for _, row in table.iterrows():
+        records.append((row['name'],
+                        hours_to_deg(parse_list(row['ra'])),
+                        parse_list(row['dec']),
+                        parse_list(row['stars'], np.int64),
+                        {'constellation': row['constellation'], 'zodiac': bool(row['zodiac'])}))
+    return ShapeStore.from_records(records).to_columns()
+
+
+def build_boundaries(path):
+    """Parse constellations.csv once: boundary vertex lists become flat arrays"""
+    import pandas as pd
+    table = pd.read_csv(path)
+    records = []
+    for _, row in table.iterrows():
+        records.append((row['name'],
+                        hours_to_deg(parse_list(row['ra'])),
+                        parse_list(row['dec']),
+                        None, None))
+    return ShapeStore.from_records(records).to_columns()
+
+
+def hip_index(hips):
+    """Hash index from HIP id to star table row (rows without a HIP id are skipped)"""
+    return {hip: row for row, hip in enumerate(np.asarray(hips).tolist()) if hip > 0}
+
+
+def iter_boundary_dat(path):
+    """Stream bound_20.dat as (name, ra_hours, dec) vertices, one line at a time"""
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 3:
+                continue
+            yield fields[2], float(fields[0]), float(fields[1])
+
+
+def iter_constellationship(path):
+    """Stream constellationship.fab as (abbreviation, [hip, hip, ...]) line-pair records"""
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 2 or line.lstrip().startswith('#'):
+                continue
+            yield fields[0], [int(hip) for hip in fields[2:]]
+
+
+def read_constellation_names(path):
+    """Abbreviation -> English name from a Stellarium constellation_names.*.fab file"""
+    names = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            fields = line.split('\t')
+            if len(fields) >= 2:
+                names[fields[0].strip()] = fields[1].strip().strip('"')
+    return names
+
+
+def build_boundaries_dat(path):
+    """Boundary geometry straight from bound_20.dat, one shape per constellation label"""
+    ras, decs = {}, {}
+    for name, ra, dec in iter_boundary_dat(path):
+        if name not in ras:
+            ras[name], decs[name] = [], []
+        ras[name].append(ra)
+        decs[name].append(dec)
+    records = ((name, hours_to_deg(np.array(ras[name])), np.array(decs[name]), None, None)
+               for name in ras)
+    return ShapeStore.from_records(records).to_columns()
+
+
+def build_asterisms_fab(path, names_path, stars):
+    """Asterism geometry from constellationship.fab, resolving HIP ids against the star table
+
+    Line pairs whose endpoints are not in the star table (e.g. fainter than the
+    magnitude cut) are dropped.
+    """
+    index = hip_index(stars['hip'])
+    star_ra = stars['ra_deg']
+    star_dec = stars['dec']
+    names = read_constellation_names(names_path)
+    records = []
+    dropped = 0
+    for abbr, hips in iter_constellationship(path):
+        pairs = []
+        for a, b in zip(hips[0::2], hips[1::2]):
+            if a in index and b in index:
+                pairs += [a, b]
+            else:
+                dropped += 1
+        rows = np.array([index[hip] for hip in pairs], dtype=np.int64)
+        records.append((names.get(abbr, abbr),
+                        star_ra[rows].astype(np.float64),
+                        star_dec[rows].astype(np.float64),
+                        np.array(pairs, dtype=np.int64),
+                        {'constellation': abbr, 'zodiac': abbr in ZODIAC}))
+    if dropped:
+        warnings.warn(f'{dropped} asterism line(s) in {path} reference stars missing from the catalog')
+    return ShapeStore.from_records(records).to_columns()
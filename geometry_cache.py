@@ -0,0 +1,105 @@
+from collections import OrderedDict
+import numpy as np
+import kernels
+from config import WIDTH, HEIGHT
+
+
+class SkyLines:
+    """Polylines of some ShapeStore shapes in sky coordinates, ready for a cheap per-view transform
+
+    RA is unwrapped along each shape (no 360 degree jumps inside a shape), so
+    under the equirectangular projection a shape reaches the screen through one
+    shift and scale, whatever the view centre. `vertices` indexes the vertices
+    back into the store (StarMap.screen_layer `layer`), for projections that need
+    the full per-vertex maths.
+    """
+    def __init__(self, store, indices, layer='asterisms'):
+        self.layer = layer
+        spans = [store.bounds(i) for i in indices]
+        self.vertices = np.concatenate([np.arange(start, end) for start, end in spans]
+                                       or [np.empty(0, np.int64)]).astype(np.int64)
+        self.offsets = np.r_[0, np.cumsum([end - start for start, end in spans], dtype=np.int64)]
+        self.ra = np.concatenate([np.unwrap(store.ra[start:end], period=360) for start, end in spans]
+                                 or [np.empty(0)])
+        self.dec = store.dec[self.vertices]
+        # Widest RA span of a single shape, which decides when shapes must be repeated across the seam
+        spans = zip(self.offsets[:-1], self.offsets[1:])
+        self.extent = max([np.ptp(self.ra[lo:hi]) for lo, hi in spans if hi > lo], default=0.0)
+
+    @property
+    def nbytes(self):
+        return self.vertices.nbytes + self.offsets.nbytes + self.ra.nbytes + self.dec.nbytes
+
+    def screen_runs(self, star_proj):
+        """Integer screen point runs for star_proj's current view, split at hidden vertices"""
+        if star_proj.projection.name == 'equirectangular':
+            scale_inv = 1.0 / star_proj.scale
+            lengths = np.diff(self.offsets)
+            # Whole turns that bring each shape's first vertex within half a turn of the view centre
+            turns = np.round((star_proj.view_ra - self.ra[self.offsets[:-1]]) / 360) * 360
+            x = WIDTH / 2 + (self.ra + np.repeat(turns, lengths) - star_proj.view_ra) * scale_inv
+            y = HEIGHT / 2 - (self.dec - star_proj.view_dec) * scale_inv
+            visible = self.dec >= 0 if star_proj.observer is not None else np.ones(len(x), dtype=bool)
+            starts, ends = kernels.split_runs(x, visible, self.offsets, np.inf, pairs=True)
+            shifts = [0.0]
+            if WIDTH / 2 * star_proj.scale + self.extent > 180:
+                # The view is wide enough to show a shape on both sides of the RA seam
+                shifts += [-360 * scale_inv, 360 * scale_inv]
+        else:
+            x_all, y_all, visible_all = star_proj.screen_layer(self.layer)
+            x, y, visible = x_all[self.vertices], y_all[self.vertices], visible_all[self.vertices]
+            # Break where consecutive vertices jump across the screen or one end is hidden
+            starts, ends = kernels.split_runs(x, visible, self.offsets, WIDTH * 0.8, pairs=True)
+            shifts = [0.0]
+        runs = []
+        for shift in shifts:
+            points = np.column_stack([x + shift, y]).astype(int)
+            runs += [points[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+        return runs
+
+
+class GeometryCache:
+    """LRU of sky-space geometry (SkyLines), bounded by the bytes of the arrays it holds
+
+    Entries do not depend on the view, so panning and zooming never invalidate them;
+    only a change of positions (a new sky version) makes new keys. Sky versions
+    only grow, so the owner clears the cache when the version moves on instead of
+    letting dead entries fill it, which in horizon mode would happen every tick.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build):
+        """Entry for `key`, calling build() to make it on a miss"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        entry = build()
+        self._entries[key] = entry
+        self.bytes += entry.nbytes
+        # Always keep the newest entry, even if it alone exceeds the cap
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+        return entry
+
+    def clear(self):
+        """Drop every entry, e.g. once their sky version can no longer be asked for"""
+        self.evictions += len(self._entries)
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes}
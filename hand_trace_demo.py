@@ -1,8 +1,5 @@
-import cv2
-import mediapipe as mp
 import math
 import time
-import pyautogui
 
 class HandGestureController:
     GRIP_THRESHOLD = 40
@@ -11,6 +8,10 @@ class HandGestureController:
 
     # Initializes the hand gesture controller and sets up video capture.
     def __init__(self, camera_index=0):
+        # Heavy dependencies are imported on first use so they stay off the startup path
+        import cv2
+        import mediapipe as mp
+
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.7)
         self.mp_drawing = mp.solutions.drawing_utils
@@ -55,6 +56,9 @@ class HandGestureController:
 
     # Main loop: captures frames, processes hand gestures, and performs corresponding actions.
     def run(self):
+        import cv2
+        import pyautogui
+
         while self.cap.isOpened():
             ret, frame = self.cap.read()
             if not ret:
@@ -0,0 +1,115 @@
+import time
+import numpy as np
+from geometry import ShapeStore
+
+UNIX_EPOCH_JD = 2440587.5
+J2000_JD = 2451545.0
+
+
+def julian_date(unix_time):
+    return unix_time / 86400.0 + UNIX_EPOCH_JD
+
+
+def local_sidereal_time(unix_time, longitude):
+    """Local mean sidereal time in degrees (IAU 1982 GMST plus east longitude)"""
+    d = julian_date(unix_time) - J2000_JD
+    t = d / 36525
+    gmst = 280.46061837 + 360.98564736629 * d + 0.000387933 * t**2 - t**3 / 38710000
+    return (gmst + longitude) % 360
+
+
+class HorizonTransform:
+    """RA/Dec -> azimuth/altitude for a fixed set of points, into preallocated buffers
+
+    Everything that does not depend on time (the trigonometry of each point's
+    declination) is precomputed, and update() writes through `out=` arguments
+    only, so a per-frame call allocates nothing.
+    """
+    def __init__(self, ras, decs):
+        n = len(ras)
+        self.ra = np.radians(np.asarray(ras, dtype=np.float64))
+        dec = np.radians(np.asarray(decs, dtype=np.float64))
+        self.sin_dec = np.sin(dec)
+        self.cos_dec = np.cos(dec)
+        # Results, in degrees; azimuth runs from north through east. Points no update()
+        # has reached yet sit at the nadir, so the below-horizon cull hides them
+        self.az = np.zeros(n)
+        self.alt = np.full(n, -90.0)
+        self._h = np.empty(n)
+        self._cos_h = np.empty(n)
+        self._a = np.empty(n)
+        self._b = np.empty(n)
+
+    def update(self, lst_deg, latitude, count=None, start=0):
+        """Recompute points `start` up to `count` (all by default) for a sidereal time and latitude"""
+        rows = slice(start, len(self.ra) if count is None else count)
+        h, cos_h, a, b = self._h[rows], self._cos_h[rows], self._a[rows], self._b[rows]
+        sin_dec, cos_dec = self.sin_dec[rows], self.cos_dec[rows]
+        az, alt = self.az[rows], self.alt[rows]
+        sin_lat, cos_lat = np.sin(np.radians(latitude)), np.cos(np.radians(latitude))
+
+        # Hour angle
+        np.subtract(np.radians(lst_deg), self.ra[rows], out=h)
+        np.cos(h, out=cos_h)
+        # sin(alt) = sin(lat) sin(dec) + cos(lat) cos(dec) cos(H)
+        np.multiply(cos_dec, cos_h, out=a)
+        np.multiply(a, cos_lat, out=alt)
+        np.multiply(sin_dec, sin_lat, out=b)
+        np.add(alt, b, out=alt)
+        np.clip(alt, -1, 1, out=alt)
+        np.arcsin(alt, out=alt)
+        np.degrees(alt, out=alt)
+        # az = atan2(-cos(dec) sin(H), sin(dec) cos(lat) - cos(dec) sin(lat) cos(H))
+        np.multiply(a, sin_lat, out=a)
+        np.multiply(sin_dec, cos_lat, out=b)
+        np.subtract(b, a, out=b)
+        np.sin(h, out=a)
+        np.multiply(a, cos_dec, out=a)
+        np.negative(a, out=a)
+        np.arctan2(a, b, out=az)
+        np.degrees(az, out=az)
+        np.mod(az, 360, out=az)
+        return az, alt
+
+
+class Observer:
+    """Site on Earth whose horizon view of a star table and its constellation geometry is kept current
+
+    The alt-az versions of the tables share the transform buffers, so after
+    update() every consumer sees the new positions without copies.
+    """
+    def __init__(self, latitude, longitude, stars, asterisms, boundaries):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.source = stars
+        self._stars = HorizonTransform(stars['ra_deg'], stars['dec'])
+        self._asterisms = HorizonTransform(asterisms.ra, asterisms.dec)
+        self._boundaries = HorizonTransform(boundaries.ra, boundaries.dec)
+        self.stars = stars.with_columns(ra_deg=self._stars.az, dec=self._stars.alt)
+        self.asterisms = ShapeStore(asterisms.names, asterisms.offsets, self._asterisms.az,
+                                    self._asterisms.alt, asterisms.vertex_ids, asterisms.info)
+        self.boundaries = ShapeStore(boundaries.names, boundaries.offsets, self._boundaries.az,
+                                     self._boundaries.alt, boundaries.vertex_ids, boundaries.info)
+        self.lst = None
+        # Leading star rows transformed for the current `lst`
+        self.star_count = 0
+
+    def update(self, unix_time=None, star_count=None):
+        """Move everything to the sky at `unix_time` (now by default); stars beyond `star_count` are skipped"""
+        self.lst = local_sidereal_time(time.time() if unix_time is None else unix_time, self.longitude)
+        self._stars.update(self.lst, self.latitude, star_count)
+        self._asterisms.update(self.lst, self.latitude)
+        self._boundaries.update(self.lst, self.latitude)
+        self.star_count = len(self._stars.ra) if star_count is None else star_count
+        return self.lst
+
+    def extend(self, star_count):
+        """Transform stars up to `star_count` for the current `lst` when the last update stopped short
+
+        Returns True when rows were added.
+        """
+        if self.lst is None or star_count <= self.star_count:
+            return False
+        self._stars.update(self.lst, self.latitude, star_count, start=self.star_count)
+        self.star_count = star_count
+        return True
@@ -0,0 +1,273 @@
+import importlib.util
+import math
+import sys
+import threading
+import numpy as np
+from config import JIT_KERNELS
+from startup import startup_trace
+
+# Array kernels of the per-frame pipeline: projection to the screen, the on-screen
+# cull, splitting polylines into drawable runs and splatting star discs into a pixel
+# array. Each has a NumPy implementation. When Numba is installed (and JIT_KERNELS
+# is on) a compiled loop is used by default instead; it releases the GIL, so
+# ChunkPool threads run it in parallel. tests/test_kernels.py and
+# `benchmark.py --check` compare the two.
+#
+# Numba is only looked up here, not imported: the import and each loop's
+# compilation happen on the first dispatch that needs them, as their own
+# startup-trace phases, instead of on every start of the viewer.
+
+HAVE_NUMBA = importlib.util.find_spec('numba') is not None
+# Backend used by default; pass jit=False to any kernel to force NumPy
+JIT = HAVE_NUMBA and JIT_KERNELS
+
+# Projection laws the compiled kernels know, by projection name
+_KINDS = {'equirectangular': 0, 'gnomonic': 1, 'stereographic': 2, 'orthographic': 3}
+
+# How closely the two project() backends agree on the catalog's float32 columns: NumPy
+# stays in float32 while the compiled loop works in float64, so plane positions differ
+# by float32 rounding. That is relative, plus an absolute floor in plane degrees (times
+# scale_inv for pixels) for small offsets, where the azimuthal laws' radial factor (up
+# to 20 near the stereographic cull) amplifies the rounding of the trigonometry
+PROJECT_RTOL = 1e-5
+PROJECT_ATOL_DEG = 1e-3
+
+
+# NumPy implementations
+
+def _project_numpy(projection, ras, decs, ra0, dec0, scale_inv, horizon):
+    x, y, visible = projection.forward(ras, decs, ra0, dec0)
+    if horizon:
+        visible &= decs >= 0  # Below the horizon
+    return x * scale_inv, y * scale_inv, visible
+
+
+def _split_runs_numpy(x, visible, offsets, max_dx):
+    if len(x) < 2:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    # Segment i joins vertices i and i+1; it breaks on a wrap, a hidden end or a shape boundary
+    joined = (np.abs(np.diff(x)) < max_dx) & visible[:-1] & visible[1:]
+    boundaries = offsets[1:-1]
+    joined[boundaries[(boundaries > 0) & (boundaries < len(x))] - 1] = False
+    edges = np.diff(np.r_[False, joined, False].astype(np.int8))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) + 1
+
+
+def disc_offsets(radius):
+    """Pixel offsets (dx, dy) covered by a disc of `radius` pixels"""
+    d = np.arange(-radius, radius + 1)
+    dx, dy = np.meshgrid(d, d, indexing='ij')
+    inside = dx * dx + dy * dy <= radius * radius
+    return dx[inside], dy[inside]
+
+
+def _byte_view(pixels):
+    """(flat uint8 view of a pixel array's memory, byte offset of each axis, offset of [0, 0, 0])
+
+    surfarray.pixels3d arrays are strided, with the channel axis running backwards;
+    1-D indexing of the raw bytes is much faster than fancy indexing of such a view.
+    """
+    strides = pixels.strides
+    # The element at the lowest address: the last one along every axis with a negative stride
+    corner = tuple(slice(n - 1, n) if step < 0 else slice(0, 1) for n, step in zip(pixels.shape, strides))
+    span = sum(abs(step) * (n - 1) for n, step in zip(pixels.shape, strides)) + 1
+    flat = np.lib.stride_tricks.as_strided(pixels[corner], shape=(span,), strides=(1,))
+    origin = -sum(step * (n - 1) for n, step in zip(pixels.shape, strides) if step < 0)
+    return flat, strides, origin
+
+
+def _splat_numpy(pixels, x, y, radius, amount):
+    width, height = pixels.shape[:2]
+    flat, (step_x, step_y, step_c), origin = _byte_view(pixels)
+    # Every (star, disc pixel) pair inside the frame, as the pixel's byte address and the star
+    addresses, owners = [], []
+    inner = (x >= radius) & (x + radius < width) & (y >= radius) & (y + radius < height)
+    for r in np.flatnonzero(np.bincount(radius)).tolist():
+        dx, dy = disc_offsets(r)
+        # Discs wholly inside the frame: each star's address plus the disc's address offsets
+        stars = np.flatnonzero((radius == r) & inner)
+        addresses.append((x[stars, None] * step_x + y[stars, None] * step_y + origin
+                          + (dx * step_x + dy * step_y)).ravel())
+        owners.append(np.repeat(stars, len(dx)))
+        # Discs cut by the frame's edge keep only their pixels inside it
+        stars = np.flatnonzero((radius == r) & ~inner)
+        px = x[stars, None] + dx
+        py = y[stars, None] + dy
+        inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+        addresses.append((px * step_x + py * step_y)[inside] + origin)
+        owners.append(np.broadcast_to(stars[:, None], px.shape)[inside])
+    addresses = np.concatenate(addresses)
+    if len(addresses) == 0:
+        return
+    # One sort of packed (address, star) keys groups the pairs by pixel, in memory order,
+    # so only the pixels actually touched are accumulated and written back
+    bits = max(len(x) - 1, 1).bit_length()
+    keys = np.sort((addresses << bits) | np.concatenate(owners))
+    addresses, owners = keys >> bits, keys & ((1 << bits) - 1)
+    last = np.flatnonzero(np.r_[addresses[1:] != addresses[:-1], True])
+    touched = addresses[last]
+    for channel, add in enumerate(np.ascontiguousarray(amount.T)):
+        # Overlapping discs add up: per-pixel sums are differences of the running sum.
+        # Adding positive amounts and clipping once equals saturating each add
+        running = np.cumsum(add[owners])[last]
+        total = np.diff(running, prepend=0)
+        index = touched + channel * step_c
+        flat[index] = np.minimum(flat[index] + total, 255)
+
+
+# Loops compiled by Numba (plain Python until then)
+
+def _project_loop(ras, decs, ra0, dec0, kind, min_cos, scale_inv, horizon, xs, ys, visible):
+    ra0_rad = math.radians(ra0)
+    sin_d0 = math.sin(math.radians(dec0))
+    cos_d0 = math.cos(math.radians(dec0))
+    for i in range(len(ras)):
+        if kind == 0:
+            x = (ras[i] - ra0 + 180) % 360 - 180
+            y = decs[i] - dec0
+            seen = True
+        else:
+            dec = math.radians(decs[i])
+            d_ra = math.radians(ras[i]) - ra0_rad
+            sin_d = math.sin(dec)
+            cos_d = math.cos(dec)
+            cos_dra = math.cos(d_ra)
+            cos_c = sin_d0 * sin_d + cos_d0 * cos_d * cos_dra
+            seen = cos_c > min_cos
+            if not seen:
+                cos_c = 1.0
+            if kind == 1:
+                k = 1 / cos_c
+            elif kind == 2:
+                k = 2 / (1 + cos_c)
+            else:
+                k = 1.0
+            k = math.degrees(k)
+            x = k * cos_d * math.sin(d_ra)
+            y = k * (cos_d0 * sin_d - sin_d0 * cos_d * cos_dra)
+        if horizon and decs[i] < 0:
+            seen = False
+        xs[i] = x * scale_inv
+        ys[i] = y * scale_inv
+        visible[i] = seen
+
+
+def _split_runs_loop(x, visible, offsets, max_dx, starts, ends):
+    count = 0
+    for shape in range(len(offsets) - 1):
+        start = offsets[shape]
+        end = offsets[shape + 1]
+        for i in range(offsets[shape], end - 1):
+            if not (abs(x[i + 1] - x[i]) < max_dx and visible[i] and visible[i + 1]):
+                if i + 1 - start >= 2:
+                    starts[count] = start
+                    ends[count] = i + 1
+                    count += 1
+                start = i + 1
+        if end - start >= 2:
+            starts[count] = start
+            ends[count] = end
+            count += 1
+    return count
+
+
+def _splat_loop(pixels, x, y, radius, amount):
+    width, height = pixels.shape[0], pixels.shape[1]
+    for i in range(len(x)):
+        r = radius[i]
+        for dx in range(-r, r + 1):
+            px = x[i] + dx
+            if px < 0 or px >= width:
+                continue
+            for dy in range(-r, r + 1):
+                py = y[i] + dy
+                if py < 0 or py >= height or dx * dx + dy * dy > r * r:
+                    continue
+                for c in range(3):
+                    value = pixels[px, py, c] + amount[i, c]
+                    pixels[px, py, c] = 255 if value > 255 else value
+
+
+# Dispatch
+
+_compiled = {}
+_compile_lock = threading.Lock()
+
+
+def _call_compiled(loop, *args):
+    """Run the Numba-compiled version of `loop`, importing Numba and compiling it on first use"""
+    kernel = _compiled.get(loop)
+    if kernel is None:
+        # One thread compiles; ChunkPool workers arriving meanwhile wait and reuse the result
+        with _compile_lock:
+            kernel = _compiled.get(loop)
+            if kernel is None:
+                if 'numba' not in sys.modules:
+                    with startup_trace.phase('import numba'):
+                        importlib.import_module('numba')
+                kernel = sys.modules['numba'].njit(nogil=True, cache=True)(loop)
+                # Numba compiles (or loads its on-disk cache) on the first call
+                with startup_trace.phase(f'compile {loop.__name__}'):
+                    result = kernel(*args)
+                _compiled[loop] = kernel
+                return result
+    return kernel(*args)
+
+
+def project(projection, ras, decs, ra0, dec0, scale_inv, horizon=False, jit=JIT):
+    """Plane offsets from the view centre in pixels, plus the visibility mask
+
+    `horizon` also hides points below Dec (altitude) 0.
+    """
+    kind = _KINDS.get(projection.name)
+    if not (jit and HAVE_NUMBA) or kind is None:
+        return _project_numpy(projection, ras, decs, ra0, dec0, scale_inv, horizon)
+    n = len(ras)
+    xs, ys, visible = np.empty(n), np.empty(n), np.empty(n, dtype=bool)
+    _call_compiled(_project_loop, np.asarray(ras), np.asarray(decs), float(ra0), float(dec0), kind,
+                   float(getattr(projection, 'min_cos', -1.0)), float(scale_inv), horizon, xs, ys, visible)
+    return xs, ys, visible
+
+
+def split_runs(x, visible, offsets, max_dx, pairs=False, jit=JIT):
+    """Vertex runs [start, end) of a ShapeStore layer that can be drawn as unbroken polylines
+
+    A run breaks where consecutive vertices jump more than `max_dx` on screen (RA wrap),
+    where either end is hidden, and at shape boundaries; runs of a single vertex are dropped.
+    With `pairs` the shapes are lists of separate segments (asterism line pairs, drawn
+    (0, 1), (2, 3), ...): a run that would start on the second vertex of a pair starts at
+    the next pair instead, so every run still steps through whole pairs.
+    """
+    if not (jit and HAVE_NUMBA):
+        starts, ends = _split_runs_numpy(x, visible, offsets, max_dx)
+    else:
+        starts = np.empty(len(x), np.int64)
+        ends = np.empty(len(x), np.int64)
+        count = _call_compiled(_split_runs_loop, np.asarray(x), np.asarray(visible),
+                               np.asarray(offsets, dtype=np.int64), float(max_dx), starts, ends)
+        starts, ends = starts[:count], ends[:count]
+    if pairs:
+        offsets = np.asarray(offsets, dtype=np.int64)
+        # Offset of the shape each run starts in (the last shape starting at or before it)
+        shape_starts = offsets[np.searchsorted(offsets, starts, side='right') - 1]
+        starts = starts + (starts - shape_starts) % 2
+        keep = ends - starts >= 2
+        starts, ends = starts[keep], ends[keep]
+    return starts, ends
+
+
+def splat(pixels, x, y, radius, color, intensity, jit=JIT):
+    """Add discs of `color` * `intensity` into a (width, height, 3) uint8 pixel array
+
+    Centres and radii are in whole pixels; overlapping discs add up and saturate at 255.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    radius = np.asarray(radius, dtype=np.int64)
+    amount = np.rint(np.asarray(color, dtype=np.float64) * np.asarray(intensity)[:, None]).astype(np.int64)
+    if len(x) == 0:
+        return
+    if jit and HAVE_NUMBA:
+        _call_compiled(_splat_loop, pixels, x, y, radius, amount)
+    else:
+        _splat_numpy(pixels, x, y, radius, amount)
@@ -1,14 +1,84 @@
-import pandas as pd
+import hashlib
+import os
 import numpy as np
+from catalog import load_compiled
+from config import GEOMETRY_FORMAT, PARTITIONED_CATALOG, PARTITION_MAX_CELLS
+from partition import PartitionedCatalog
+from star_style import star_colors, star_radii
+from geometry import (ShapeStore, build_asterisms, build_boundaries,
+                      build_asterisms_fab, build_boundaries_dat)
 
-def loadData():
-    # Load datasets
-    stars = pd.read_csv('./data/hygdata_processed_mag65.csv')
-    asterisms = pd.read_csv('./data/asterisms.csv')
-    constellations = pd.read_csv('./data/constellations.csv')
-    const_names = pd.read_csv('./data/centered_constellations.csv', encoding="latin-1")
+STAR_FILE = './data/hygdata_processed_mag65.csv'
+ASTERISM_FILE = './data/asterisms.csv'
+BOUNDARY_FILE = './data/constellations.csv'
+ASTERISM_FAB = './data/constellationship.fab'
+NAMES_FAB = './data/constellation_names.eng.fab'
+BOUNDARY_DAT = './data/bound_20.dat'
+NAME_FILE = './data/centered_constellations.csv'
+
+# Columns StarMap and the renderer read every frame; the other HYG columns are mapped on first use
+STAR_COLUMNS = ('ra_deg', 'dec', 'mag', 'ci', 'color', 'radius')
+# HYG identifiers stored as int32 with -1 for missing values
+INT_COLUMNS = ('id', 'hip', 'hd', 'hr', 'flam', 'comp', 'comp_primary')
 
-    # Preprocess coordinates
+def _build_stars(path):
+    """Parse the HYG CSV into narrow (float32/int32) NumPy columns for the compiled catalog"""
+    import pandas as pd  # Only needed when the compiled catalog is (re)built
+    stars = pd.read_csv(path)
     stars['ra_deg'] = stars['ra'] * 15  # Convert hours to degrees
-    
+    # Brightest first, so any magnitude limit selects a prefix of the table
+    stars = stars.sort_values('mag', kind='stable').reset_index(drop=True)
+
+    columns = {}
+    for name in stars.columns:
+        values = stars[name]
+        if name in INT_COLUMNS:
+            columns[name] = values.fillna(-1).to_numpy().astype(np.int32)
+        elif values.dtype.kind in 'biuf':
+            columns[name] = values.to_numpy().astype(np.float32)
+        else:
+            # Fixed-width unicode keeps the column memory-mappable
+            columns[name] = values.fillna('').astype(str).to_numpy().astype(str)
+
+    # Render attributes are derived once here instead of per star per frame
+    columns['color'] = star_colors(columns['ci'])
+    columns['radius'] = star_radii(columns['mag'])
+    return columns
+
+def _build_names(path):
+    """Constellation label positions as NumPy columns"""
+    import pandas as pd
+    names = pd.read_csv(path, encoding="latin-1")
+    return {name: names[name].to_numpy().astype(str) if names[name].dtype.kind not in 'biuf'
+            else names[name].to_numpy() for name in names.columns}
+
+def _cache_name(name, star_file):
+    """Cache name for a table built from `star_file`; catalogs other than STAR_FILE get their own"""
+    if os.path.abspath(star_file) == os.path.abspath(STAR_FILE):
+        return name
+    return f'{name}-{hashlib.sha1(os.path.abspath(star_file).encode()).hexdigest()[:10]}'
+
+def load_stars(columns=STAR_COLUMNS, star_file=STAR_FILE):
+    """Compiled star table, rebuilt from the CSV whenever it changed"""
+    return load_compiled(_cache_name('stars', star_file), star_file, _build_stars, columns)
+
+def loadData(columns=STAR_COLUMNS, star_file=STAR_FILE):
+    # Load datasets
+    stars = load_stars(columns, star_file)
+    if GEOMETRY_FORMAT == 'native':
+        asterisms = load_compiled(_cache_name('asterisms_fab', star_file),
+                                  (ASTERISM_FAB, NAMES_FAB, star_file),
+                                  lambda paths: build_asterisms_fab(paths[0], paths[1], stars))
+        constellations = load_compiled('boundaries_dat', BOUNDARY_DAT, build_boundaries_dat)
+    else:
+        asterisms = load_compiled('asterisms', ASTERISM_FILE, build_asterisms)
+        constellations = load_compiled('boundaries', BOUNDARY_FILE, build_boundaries)
+    asterisms = ShapeStore.from_columns(asterisms)
+    constellations = ShapeStore.from_columns(constellations)
+    const_names = load_compiled('names', NAME_FILE, _build_names)
+
+    if PARTITIONED_CATALOG:
+        # Geometry still resolves HIP ids against the bundled table; the sky itself pages in by cell
+        stars = PartitionedCatalog(PARTITIONED_CATALOG, PARTITION_MAX_CELLS, columns or STAR_COLUMNS)
+
     return stars, asterisms, constellations, const_names
@@ -1,17 +1,26 @@
-import pygame
-from config import *
-from star_projection import StarMap
-from render import Renderer
-from selection import find_nearest_star
+from startup import startup_trace
+with startup_trace.phase('import pygame'):
+    import pygame
+with startup_trace.phase('import star map modules'):
+    from config import *
+    from star_projection import StarMap
+    from render import Renderer, STAR_RENDERERS
+    from selection import find_nearest_star
+    from projection import PROJECTIONS
+    from frame_scheduler import FrameScheduler
 
 def main():
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    clock = pygame.time.Clock()
+    with startup_trace.phase('pygame init'):
+        pygame.init()
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    # Frames are drawn only when something changed; otherwise the loop sleeps in event.wait
+    scheduler = FrameScheduler(TARGET_FPS, IDLE_WAIT_MS)
+    last_report = 0
     
     # Initialize star projection and renderer
-    star_proj = StarMap()
-    renderer = Renderer(star_proj)
+    with startup_trace.phase('StarMap'):
+        star_proj = StarMap()
+    renderer = Renderer(star_proj, STAR_RENDERER)
     
     # Interaction state variables
     dragging = False
@@ -27,10 +36,42 @@ def main():
 
     running = True
     while running:
-        # Event processing loop
-        for event in pygame.event.get():
+        # Event processing loop (blocks while nothing needs drawing)
+        for event in scheduler.events():
             if event.type == pygame.QUIT:
                 running = False
+
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                # Scrub the sky through time
+                step = EPOCH_STEP_YEARS if event.key == pygame.K_RIGHT else -EPOCH_STEP_YEARS
+                try:
+                    star_proj.set_epoch(star_proj.epoch + step)
+                except ValueError as error:  # Not available with PARTITIONED_CATALOG
+                    print(f'Epoch unchanged: {error}')
+                    continue
+                star_proj.selected_stars = []
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                # Toggle the live horizon view for the configured site
+                try:
+                    if star_proj.observer is None:
+                        star_proj.set_observer(OBSERVER_LATITUDE, OBSERVER_LONGITUDE)
+                    else:
+                        star_proj.set_observer()
+                except ValueError as error:  # Not available with PARTITIONED_CATALOG
+                    print(f'Horizon view unavailable: {error}')
+                    continue
+                star_proj.selected_stars = []
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                # Cycle through the available sky projections
+                names = list(PROJECTIONS)
+                star_proj.set_projection(names[(names.index(star_proj.projection.name) + 1) % len(names)])
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_s:
+                # Switch between the sprite and pixel-splat star renderers
+                index = STAR_RENDERERS.index(renderer.star_renderer)
+                renderer.star_renderer = STAR_RENDERERS[(index + 1) % len(STAR_RENDERERS)]
                 
             # Mouse event handling
             if event.type == pygame.MOUSEBUTTONDOWN:
@@ -45,18 +86,12 @@ def main():
                 elif event.button == 3:  # Right mouse button
                     dragging = True
                     last_pos = event.pos
-                    renderer.asterism_cache.clear()  # Clear cached asterism paths
-                    renderer.constellation_cache.clear()  # Clear cached constellation paths
 
                 elif event.button == 4:  # Mouse wheel up (zoom in)
                     star_proj.scale = max(star_proj.scale * 0.9, star_proj.max_scale)
-                    renderer.asterism_cache.clear()  # Clear cached asterism paths
-                    renderer.constellation_cache.clear()  # Clear cached constellation paths
 
                 elif event.button == 5:  # Mouse wheel down (zoom out)
                     star_proj.scale = min(star_proj.scale * 1.1, star_proj.min_scale)
-                    renderer.asterism_cache.clear()  # Clear cached asterism paths
-                    renderer.constellation_cache.clear()  # Clear cached constellation paths
             
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 3:  # Left button release
@@ -67,11 +102,21 @@ def main():
                 dx, dy = event.pos[0] - last_pos[0], event.pos[1] - last_pos[1]
                 last_pos = event.pos
                 
-                # Update view coordinates
-                star_proj.view_ra -= dx * star_proj.scale * drag_sensitivity
-                star_proj.view_dec += dy * star_proj.scale * drag_sensitivity
-                renderer.asterism_cache.clear()  # Invalidate cached paths
-                renderer.constellation_cache.clear()  # Invalidate cached paths
+                # Update view coordinates (one clamp and visibility update for both axes)
+                star_proj.set_view(ra=star_proj.view_ra - dx * star_proj.scale * drag_sensitivity,
+                                   dec=star_proj.view_dec + dy * star_proj.scale * drag_sensitivity)
+
+        # Follow the clock in horizon mode, stepping the sky every HORIZON_TICK_SECONDS
+        scheduler.animate(HORIZON_TICK_SECONDS if star_proj.observer is not None else None)
+        if scheduler.animation_due():
+            star_proj.tick()
+
+        # Redraw only when the view, the selection or the star renderer changed
+        scheduler.track('view', star_proj.view_state())
+        scheduler.track('selection', [(vertex, name) for vertex, name in star_proj.selected_stars])
+        scheduler.track('renderer', renderer.star_renderer)
+        if not scheduler.dirty or not running:
+            continue
 
         # Rendering pipeline
         back_buffer.fill(BACKGROUND_COLOR)  # Clear background
@@ -88,9 +133,15 @@ def main():
         # Update display
         screen.blit(back_buffer, (0, 0))
         pygame.display.flip()  # Swap buffers
+        startup_trace.first_frame()
         
-        clock.tick(60)  # Maintain 60 FPS
+        scheduler.frame_drawn()  # Caps the rate at TARGET_FPS while things keep changing
+        elapsed = scheduler.stats()['elapsed_s']
+        if FRAME_REPORT_SECONDS and elapsed - last_report >= FRAME_REPORT_SECONDS:
+            last_report = elapsed
+            print(scheduler.summary())
 
+    print(scheduler.summary())
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+import json
+import os
+import shutil
+import sys
+from collections import OrderedDict
+import numpy as np
+from catalog import StarCatalog, META_FILE, cached_derived
+
+PARTITION_VERSION = 1
+
+
+def overlapping_cells(view_ra, view_dec, half_width, half_height, cell_deg):
+    """RA and Dec cell indices overlapping a view box, with RA wrapping through 0/360"""
+    n_ra = int(round(360 / cell_deg))
+    n_dec = int(round(180 / cell_deg))
+    if half_width >= 180:
+        ra_cells = list(range(n_ra))
+    else:
+        first = int(np.floor((view_ra - half_width) / cell_deg))
+        last = int(np.floor((view_ra + half_width) / cell_deg))
+        ra_cells = sorted({i % n_ra for i in range(first, last + 1)})
+    low = max(int(np.floor((view_dec - half_height + 90) / cell_deg)), 0)
+    high = min(int(np.floor((view_dec + half_height + 90) / cell_deg)), n_dec - 1)
+    return ra_cells, list(range(low, high + 1))
+
+
+def cell_indices(ras, decs, cell_deg):
+    """RA and Dec cell index of every star"""
+    n_ra = int(round(360 / cell_deg))
+    n_dec = int(round(180 / cell_deg))
+    ra_idx = (np.floor((np.asarray(ras) % 360) / cell_deg).astype(np.int64)) % n_ra
+    dec_idx = np.clip(np.floor((np.asarray(decs) + 90) / cell_deg).astype(np.int64), 0, n_dec - 1)
+    return ra_idx, dec_idx
+
+
+def _cell_name(ra_idx, dec_idx):
+    return f'{ra_idx:03d}_{dec_idx:03d}'
+
+
+def build_partitioned_catalog(stars, directory, cell_deg=15, columns=None):
+    """Split a star table into one directory of .npy columns per RA/Dec cell
+
+    Stars inside each cell keep magnitude order, so the level-of-detail prefix
+    trick works per cell.
+    """
+    columns = list(columns or stars.columns)
+    ra_idx, dec_idx = cell_indices(stars['ra_deg'], stars['dec'], cell_deg)
+    order = np.lexsort((np.asarray(stars['mag']), dec_idx, ra_idx))
+    keys = (ra_idx * 1000 + dec_idx)[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+
+    tmp = directory.rstrip('/') + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    cells = {}
+    data = {name: np.asarray(stars[name]) for name in columns}
+    for start, end in zip(starts, ends):
+        rows = order[start:end]
+        name = _cell_name(ra_idx[rows[0]], dec_idx[rows[0]])
+        os.makedirs(os.path.join(tmp, name))
+        for column in columns:
+            np.save(os.path.join(tmp, name, column + '.npy'), data[column][rows])
+        cells[name] = int(end - start)
+    meta = {
+        'version': PARTITION_VERSION,
+        'cell_deg': cell_deg,
+        'rows': int(len(order)),
+        'columns': columns,
+        'dtypes': {name: data[name].dtype.str for name in columns},
+        'cells': cells,
+    }
+    with open(os.path.join(tmp, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=1)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    return meta
+
+
+class PartitionedCatalog:
+    """Star catalog split into sky cells on disk, memory-mapped on demand with an LRU bound"""
+    def __init__(self, directory, max_cells=256, columns=('ra_deg', 'dec', 'mag', 'ci', 'color', 'radius')):
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.directory = directory
+        self.cell_deg = self.meta['cell_deg']
+        self.max_cells = max_cells
+        self.load_columns = [c for c in columns if c in self.meta['columns']]
+        self._resident = OrderedDict()
+        self._gathered_key = None
+        self._gathered = None
+        self.cell_loads = 0
+        self.cell_evictions = 0
+
+    @property
+    def columns(self):
+        return list(self.meta['columns'])
+
+    def __contains__(self, name):
+        return name in self.meta['columns']
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __getitem__(self, name):
+        """Whole-sky column; this touches every cell, so keep it off the per-frame path"""
+        parts = [self.cell(cell)[name] for cell in self.meta['cells']]
+        return np.concatenate(parts) if parts else np.empty(0, self.meta['dtypes'][name])
+
+    def derived(self, key, compute):
+        """Value of `compute()` cached in the partition metadata (see cached_derived)"""
+        return cached_derived(self.meta, self.directory, key, compute)
+
+    def cell(self, name):
+        """Memory-mapped columns of one cell, paged in (and the LRU updated) on access"""
+        if name in self._resident:
+            self._resident.move_to_end(name)
+            return self._resident[name]
+        path = os.path.join(self.directory, name)
+        columns = {c: np.load(os.path.join(path, c + '.npy'), mmap_mode='r') for c in self.load_columns}
+        catalog = StarCatalog(columns, {'columns': self.meta['columns'], 'rows': self.meta['cells'][name]}, path)
+        self._resident[name] = catalog
+        self.cell_loads += 1
+        while len(self._resident) > self.max_cells:
+            self._resident.popitem(last=False)
+            self.cell_evictions += 1
+        return catalog
+
+    def cells_in_view(self, view_ra, view_dec, half_width, half_height):
+        ra_cells, dec_cells = overlapping_cells(view_ra, view_dec, half_width, half_height, self.cell_deg)
+        return [name for name in (_cell_name(i, j) for i in ra_cells for j in dec_cells)
+                if name in self.meta['cells']]
+
+    def gather(self, cells, limit_mag):
+        """Stars brighter than `limit_mag` from the given cells, as one contiguous StarCatalog"""
+        key = (tuple(cells), limit_mag)
+        if key == self._gathered_key:
+            return self._gathered
+        parts = []
+        for name in cells:
+            catalog = self.cell(name)
+            count = np.searchsorted(catalog['mag'], limit_mag, side='right')
+            parts.append(catalog.subset(slice(0, count)))
+        columns = {}
+        for column in self.load_columns:
+            pieces = [part[column] for part in parts]
+            columns[column] = np.concatenate(pieces) if pieces else np.empty(0, self.meta['dtypes'][column])
+        self._gathered_key = key
+        self._gathered = StarCatalog(columns)
+        return self._gathered
+
+
+if __name__ == '__main__':
+    # Partition the runtime catalog: python partition.py <output directory> [cell size in degrees]
+    from load_data import loadData
+    stars = loadData(columns=None)[0]
+    meta = build_partitioned_catalog(stars, sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 15)
+    print(f"{meta['rows']} stars in {len(meta['cells'])} cells written to {sys.argv[1]}")
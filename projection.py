@@ -0,0 +1,111 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+# Projections map sky coordinates (degrees) around a view centre onto a plane whose
+# units are degrees at the centre, so StarMap.scale keeps meaning degrees per pixel.
+# Every forward() returns (x, y, visible) for whole arrays at once; `visible` is the
+# hemisphere/back-face cull, and x/y stay finite for culled points.
+
+
+class Equirectangular:
+    """Plate carree: RA and Dec offsets used directly (the original StarMap mapping)"""
+    name = 'equirectangular'
+
+    def forward(self, ras, decs, ra0, dec0):
+        x = (ras - ra0 + 180) % 360 - 180
+        y = decs - dec0
+        return x, y, np.ones(np.shape(x), dtype=bool)
+
+    def inverse(self, x, y, ra0, dec0):
+        return (ra0 + x) % 360, dec0 + y
+
+    def sky_box(self, dec0, half_width, half_height):
+        """RA/Dec half extents that contain every point of a plane box"""
+        return half_width, half_height
+
+
+class Azimuthal(ABC):
+    """Shared maths of the azimuthal projections; subclasses supply the radial law"""
+    name = None
+    min_cos = -1.0  # points with cos(distance from centre) at or below this are culled
+
+    @abstractmethod
+    def radial(self, cos_c):
+        """Scale factor k(c) so that the plane radius is k * sin(c)"""
+
+    @abstractmethod
+    def distance(self, rho):
+        """Angular distance c (radians) of a plane point at radius rho"""
+
+    def forward(self, ras, decs, ra0, dec0):
+        ra = np.radians(ras)
+        dec = np.radians(decs)
+        d_ra = ra - np.radians(ra0)
+        sin_d0, cos_d0 = np.sin(np.radians(dec0)), np.cos(np.radians(dec0))
+        sin_d, cos_d = np.sin(dec), np.cos(dec)
+        cos_dra = np.cos(d_ra)
+        cos_c = sin_d0 * sin_d + cos_d0 * cos_d * cos_dra
+        visible = cos_c > self.min_cos
+        k = np.degrees(self.radial(np.where(visible, cos_c, 1.0)))
+        x = k * cos_d * np.sin(d_ra)
+        y = k * (cos_d0 * sin_d - sin_d0 * cos_d * cos_dra)
+        return x, y, visible
+
+    def inverse(self, x, y, ra0, dec0):
+        x = np.radians(np.asarray(x, dtype=np.float64))
+        y = np.radians(np.asarray(y, dtype=np.float64))
+        rho = np.hypot(x, y)
+        c = self.distance(rho)
+        sin_c, cos_c = np.sin(c), np.cos(c)
+        sin_d0, cos_d0 = np.sin(np.radians(dec0)), np.cos(np.radians(dec0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dec = np.arcsin(np.clip(cos_c * sin_d0 + np.where(rho > 0, y * sin_c / rho, 0) * cos_d0, -1, 1))
+        ra = np.radians(ra0) + np.arctan2(x * sin_c, rho * cos_d0 * cos_c - y * sin_d0 * sin_c)
+        return np.degrees(ra) % 360, np.degrees(dec)
+
+    def sky_box(self, dec0, half_width, half_height):
+        """RA/Dec half extents of the sky cap that contains a plane box"""
+        radius = np.degrees(self.distance(np.radians(np.hypot(half_width, half_height))))
+        if abs(dec0) + radius >= 90:
+            return 180, radius
+        return min(180, radius / np.cos(np.radians(abs(dec0) + radius))), radius
+
+
+class Gnomonic(Azimuthal):
+    """Central projection: great circles become straight lines; only the near hemisphere"""
+    name = 'gnomonic'
+    min_cos = 0.05
+
+    def radial(self, cos_c):
+        return 1 / cos_c
+
+    def distance(self, rho):
+        return np.arctan(rho)
+
+
+class Stereographic(Azimuthal):
+    """Conformal projection: shapes are kept, so constellations look right near the poles"""
+    name = 'stereographic'
+    min_cos = -0.9
+
+    def radial(self, cos_c):
+        return 2 / (1 + cos_c)
+
+    def distance(self, rho):
+        return 2 * np.arctan(rho / 2)
+
+
+class Orthographic(Azimuthal):
+    """The celestial sphere seen from outside: one hemisphere, foreshortened at the edge"""
+    name = 'orthographic'
+    min_cos = 0.0
+
+    def radial(self, cos_c):
+        return np.ones_like(cos_c)
+
+    def distance(self, rho):
+        return np.arcsin(np.clip(rho, 0, 1))
+
+
+PROJECTIONS = {projection.name: projection for projection in
+               (Equirectangular(), Gnomonic(), Stereographic(), Orthographic())}
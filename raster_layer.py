@@ -0,0 +1,69 @@
+import numpy as np
+import pygame
+import kernels
+from config import WIDTH, HEIGHT
+
+
+class RasterLayer:
+    """Off-screen raster of a ShapeStore's vertices covering the view plus a margin
+
+    Under the equirectangular projection a pan is a pure translation of the
+    plane, so the layer is drawn once per zoom level and every later frame is a
+    single offset blit. It is redrawn when the zoom, projection or positions
+    change, or when a pan runs past the margin. Azimuthal projections change
+    shape as the centre moves, so for them any view change redraws.
+    """
+    def __init__(self, color, margin=256, background=(0, 0, 0)):
+        self.color = color
+        self.margin = margin
+        self.background = background
+        self.surface = pygame.Surface((WIDTH + 2 * margin, HEIGHT + 2 * margin))
+        self.surface.set_colorkey(background)
+        self._key = None
+        self._centre = None
+        self.rasterisations = 0
+        self.blits = 0
+
+    def blit(self, target, star_proj, store):
+        """Draw `store` (positioned by star_proj's current view) onto `target`"""
+        scale = star_proj.scale
+        key = (scale, star_proj.projection.name, star_proj.sky_version)
+        if star_proj.projection.name != 'equirectangular':
+            key += (star_proj.view_ra, star_proj.view_dec)
+        if key != self._key or not self._covers(star_proj):
+            self._rasterise(star_proj, store)
+            self._key = key
+        d_ra, d_dec = self._shift(star_proj)
+        self.blits += 1
+        target.blit(self.surface, (int(round(-self.margin - d_ra / scale)),
+                                   int(round(-self.margin + d_dec / scale))))
+
+    def _shift(self, star_proj):
+        """Plane offset (degrees) of the current view centre from the one the layer was drawn at"""
+        ra_c, dec_c = self._centre
+        return (star_proj.view_ra - ra_c + 180) % 360 - 180, star_proj.view_dec - dec_c
+
+    def _covers(self, star_proj):
+        d_ra, d_dec = self._shift(star_proj)
+        reach = self.margin * star_proj.scale
+        return abs(d_ra) <= reach and abs(d_dec) <= reach
+
+    def _rasterise(self, star_proj, store):
+        self.rasterisations += 1
+        ra_c, dec_c = star_proj.view_ra, star_proj.view_dec
+        self._centre = (ra_c, dec_c)
+        x, y, visible = kernels.project(star_proj.projection, store.ra, store.dec, ra_c, dec_c,
+                                        1.0 / star_proj.scale, star_proj.observer is not None)
+        x = x[visible] + WIDTH / 2 + self.margin
+        y = HEIGHT / 2 + self.margin - y[visible]
+        if star_proj.projection.name == 'equirectangular':
+            # A layer wider than the whole sky shows the RA seam: repeat the vertices one turn either side
+            turn = 360 / star_proj.scale
+            if WIDTH / 2 + self.margin > turn / 2:
+                x = np.concatenate((x - turn, x, x + turn))
+                y = np.tile(y, 3)
+        width, height = self.surface.get_size()
+        inside = (x > -2) & (x < width + 2) & (y > -2) & (y < height + 2)
+        self.surface.fill(self.background)
+        for px, py in zip(x[inside].astype(int).tolist(), y[inside].astype(int).tolist()):
+            pygame.draw.circle(self.surface, self.color, (px, py), 1)
@@ -6,21 +6,33 @@ from star_projection import StarMap
 def euclidean_distance(x1, y1, x2, y2):
     return math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
 
+def angular_distance(ra1, dec1, ra2, dec2):
+    """Great-circle distance in degrees between sky points (haversine, stable for small angles)"""
+    ra1, dec1, ra2, dec2 = map(np.radians, (ra1, dec1, ra2, dec2))
+    h = np.sin((dec2 - dec1) / 2) ** 2 + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(h, 0, 1))))
+
 def find_nearest_star(star_proj, mouse_x, mouse_y):
-    for _, row in star_proj.asterisms.iterrows():
-        # Convert the RA and Dec strings into numpy arrays
-        ras = np.array([float(x) * 360 / 24 for x in row['ra'].replace('[', '').replace(']', '').split(',')])
-        decs = np.array([float(x) for x in row['dec'].replace('[', '').replace(']', '').split(',')])
-    
-        x_stars = WIDTH / 2 + ((ras - star_proj.view_ra + 180) % 360 - 180) / star_proj.scale
-        y_stars = HEIGHT / 2 - (decs - star_proj.view_dec) / star_proj.scale
-        
-        distances = np.sqrt((x_stars - mouse_x) ** 2 + (y_stars - mouse_y) ** 2)
-        min_idx = np.argmin(distances)
-    
-        if distances[min_idx] < 10:  # Threshold for selection
-            constellation = row['name']
-            #print(constellation)
-            #print(ras[min_idx], decs[min_idx])
-            return (ras[min_idx], decs[min_idx]), constellation
-    return None, None
\ No newline at end of file
+    asterisms = star_proj.asterisms
+
+    # Every asterism vertex, as already projected for this view by the renderer
+    x_stars, y_stars, visible = star_proj.screen_layer('asterisms')
+
+    distances = np.sqrt((x_stars - mouse_x) ** 2 + (y_stars - mouse_y) ** 2)
+    distances[~visible] = np.inf
+    hits = np.flatnonzero(distances < 10)  # Threshold for selection
+    if len(hits) == 0:
+        return None, None
+
+    # Asterisms are checked in catalog order; take the closest vertex of the first one hit
+    shape = asterisms.shape_of_vertex(hits[0])
+    start, end = asterisms.bounds(shape)
+    # Closest on the sky to the point under the cursor, so the choice does not depend on
+    # how the projection stretches the plane away from the view centre
+    ra, dec = star_proj.screen_to_sky(mouse_x, mouse_y)
+    separation = angular_distance(ra, dec, asterisms.ra[start:end], asterisms.dec[start:end])
+    separation[~visible[start:end]] = np.inf
+    min_idx = start + np.argmin(separation)
+    constellation = str(asterisms.names[shape])
+    # The vertex index, not its position: in horizon mode the position moves every tick
+    return int(min_idx), constellation
@@ -0,0 +1,39 @@
+import numpy as np
+from partition import cell_indices, overlapping_cells
+
+
+class SkyGrid:
+    """In-memory RA/Dec bucket index over a star table
+
+    Rows are grouped by cell (and by magnitude inside each cell) so the stars
+    under a view box are gathered from the overlapping cells only.
+    """
+    def __init__(self, ras, decs, mags, cell_deg=5):
+        self.cell_deg = cell_deg
+        self.n_ra = int(round(360 / cell_deg))
+        self.n_dec = int(round(180 / cell_deg))
+        ra_idx, dec_idx = cell_indices(ras, decs, cell_deg)
+        cells = ra_idx * self.n_dec + dec_idx
+        self.order = np.lexsort((np.asarray(mags), cells))
+        counts = np.bincount(cells, minlength=self.n_ra * self.n_dec)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def cells(self, view_ra, view_dec, half_width, half_height):
+        ra_cells, dec_cells = overlapping_cells(view_ra, view_dec, half_width, half_height, self.cell_deg)
+        return (np.asarray(ra_cells)[:, None] * self.n_dec + np.asarray(dec_cells)[None, :]).ravel()
+
+    def query(self, view_ra, view_dec, half_width, half_height):
+        """Row indices of every star in the cells overlapping the view box (a superset of the box)"""
+        cells = self.cells(view_ra, view_dec, half_width, half_height)
+        starts = self.offsets[cells]
+        lengths = self.offsets[cells + 1] - starts
+        total = lengths.sum()
+        # Concatenate the cell ranges without a Python loop
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self.order[shift + np.arange(total)]
+
+    def coverage(self, half_width, half_height):
+        """Rough fraction of all cells a view box of this size overlaps"""
+        ra_cells = min(2 * half_width / self.cell_deg + 1, self.n_ra)
+        dec_cells = min(2 * half_height / self.cell_deg + 1, self.n_dec)
+        return ra_cells * dec_cells / (self.n_ra * self.n_dec)
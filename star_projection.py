@@ -1,50 +1,101 @@
 from config import *
 from load_data import loadData
-import pandas as pd
+from startup import startup_trace
+from partition import PartitionedCatalog
+from sky_grid import SkyGrid
+from catalog import StarView
+from epoch import CATALOG_EPOCH, EpochCache
+from horizon import Observer
+from projection import PROJECTIONS
+from parallel import ChunkPool
+import kernels
 import numpy as np
+from contextlib import contextmanager
+
+def sky_bounds(ras, decs):
+    """RA/Dec extent of a star table, with the RA range taken around its widest empty gap"""
+    sorted_ras = np.sort(np.asarray(ras) % 360)
+    gaps = np.diff(sorted_ras)
+    i = int(np.argmax(gaps)) if len(gaps) else 0
+    max_gap = gaps[i] if len(gaps) else 0
+    gap_start = sorted_ras[i]
+
+    if max_gap > 180:
+        # The stars sit on one side of the sky: measure from the end of the gap, through 0/360
+        min_ra = gap_start
+        max_ra = (gap_start + max_gap) % 360
+        center_ra = np.mean(np.where(sorted_ras >= gap_start, sorted_ras, sorted_ras + 360)) % 360
+    else:
+        min_ra = sorted_ras[0]
+        max_ra = sorted_ras[-1]
+        center_ra = (min_ra + max_ra) / 2 % 360
+    decs = np.asarray(decs)
+    return {'min_ra': float(min_ra), 'max_ra': float(max_ra), 'center_ra': float(center_ra),
+            'min_dec': float(decs.min()), 'max_dec': float(decs.max())}
+
 
 class StarMap:
     def __init__(self):
         # Load datasets
-        self.stars, self.asterisms, self.constellations, self.const_names = loadData()
+        with startup_trace.phase('loadData'):
+            self.stars, self.asterisms, self.constellations, self.const_names = loadData()
         
         # Initialize view parameters
-        self._calculate_view_params()
+        with startup_trace.phase('StarMap._calculate_view_params'):
+            self._calculate_view_params()
+        self.grid = None
+        if not isinstance(self.stars, PartitionedCatalog):
+            with startup_trace.phase('SkyGrid'):
+                self.grid = SkyGrid(self.stars['ra_deg'], self.stars['dec'], self.stars['mag'], GRID_CELL_DEG)
         self._scale = self.min_scale * 0.8
         self._view_ra = self.map_center_ra
         self._view_dec = self.map_center_dec
+        self.projection = PROJECTIONS[PROJECTION]
+        # Projection and culling of large arrays are split across threads
+        self.pool = ChunkPool(PROJECTION_WORKERS, PARALLEL_MIN_CHUNK)
         self.selected_stars = []
+
+        # Positions are at the catalog epoch until set_epoch() is called
+        self.epoch = CATALOG_EPOCH
+        self._catalog_sky = (self.stars, self.asterisms, self.constellations, self.grid)
+        self._sky = self._catalog_sky
+        self._epochs = None
+
+        # Horizon (alt-az) mode: when an observer is set, the 'ra'/'dec' of every layer
+        # hold azimuth/altitude, refreshed by tick()
+        self.observer = None
+        # Bumped whenever positions move under an unchanged view, for caches keyed on the view
+        self.sky_version = 0
         
         # Performance optimizations
-        self.visible_stars = None
+        # Visible set: an index array (or slice) into the contiguous columns of visible_source
+        self.visible_source = self.stars
+        self.visible_index = slice(0, 0)
         self.last_view_params = None
         self.drag_sensitivity = 1.2
 
+        # View changes only mark derived state dirty; it is rebuilt on first use
+        self._view_dirty = True
+        self._batch_depth = 0
+        self.visibility_updates = 0
+        # How the visible set was last produced, so the incremental pan path can be checked
+        self.visibility_stats = {'full': 0, 'incremental': 0}
+        self._pan_ready = False
+
+        # Per-view screen positions of each layer, shared by the renderer and picking
+        self._screen_key = None
+        self._screen_layers = {}
+        self.screen_stats = {'projections': 0, 'hits': 0}
+
     def _calculate_view_params(self):
         """Calculate map boundaries and scale limits"""
-        ras = self.stars['ra_deg'] % 360
-        sorted_ras = sorted(ras)
-        
-        max_gap = 0
-        gap_start = 0
-        for i in range(1, len(sorted_ras)):
-            gap = sorted_ras[i] - sorted_ras[i-1]
-            if gap > max_gap:
-                max_gap = gap
-                gap_start = sorted_ras[i-1]
-        
-        if max_gap > 180:
-            self.min_ra = gap_start
-            self.max_ra = (gap_start + max_gap) % 360
-            adjusted_ras = [x if x >= gap_start else x+360 for x in sorted_ras]
-            self.map_center_ra = np.mean(adjusted_ras) % 360
-        else:
-            self.min_ra = sorted_ras[0]
-            self.max_ra = sorted_ras[-1]
-            self.map_center_ra = (self.min_ra + self.max_ra) / 2 % 360
-        
-        self.min_dec = self.stars['dec'].min()
-        self.max_dec = self.stars['dec'].max()
+        # The extent only depends on the catalog, so it is computed once and kept with it
+        bounds = self.stars.derived('view_bounds', lambda: sky_bounds(self.stars['ra_deg'], self.stars['dec']))
+        self.min_ra = bounds['min_ra']
+        self.max_ra = bounds['max_ra']
+        self.map_center_ra = bounds['center_ra']
+        self.min_dec = bounds['min_dec']
+        self.max_dec = bounds['max_dec']
         self.map_center_dec = (self.min_dec + self.max_dec) / 2
         
         map_width = self.max_ra - self.min_ra if self.max_ra > self.min_ra else (360 - self.min_ra) + self.max_ra
@@ -60,24 +111,99 @@ class StarMap:
                                self.max_dec - visible_height/2)
         self._view_ra %= 360
 
+    def limiting_magnitude(self):
+        """Faintest magnitude worth drawing at the current zoom level"""
+        return LOD_MAG_ZOOMED_OUT + LOD_MAG_PER_DECADE * np.log10(self.min_scale / self.scale)
+
     def _update_visible_stars(self):
         """Precompute visible stars for performance optimization"""
-        current_view = (self.view_ra, self.view_dec, self.scale)
+        current_view = (self.view_ra, self.view_dec, self.scale, self.projection.name)
         if current_view == self.last_view_params:
             return
         
         view_width = WIDTH * self.scale
         view_height = HEIGHT * self.scale
+        # Sky extent that contains the screen under the current projection, for the coarse cull
+        sky_half_width, sky_half_height = self.projection.sky_box(self.view_dec, view_width/2, view_height/2)
         
-        ras = self.stars['ra_deg'].values
-        decs = self.stars['dec'].values
+        # Stars are sorted by magnitude, so only a prefix is bright enough to matter
+        limit = self.limiting_magnitude()
+        if self.observer is not None:
+            # Zooming in since the last tick brings in fainter stars it did not transform
+            self.observer.extend(np.searchsorted(self.stars['mag'], limit, side='right'))
+        previous = self.last_view_params
+        self.last_view_params = current_view
+        self.visibility_updates += 1
+        if self._pan_ready and previous is not None and previous[2:] == current_view[2:]:
+            d_ra = (self.view_ra - previous[0] + 180) % 360 - 180
+            d_dec = self.view_dec - previous[1]
+            if abs(d_ra) < view_width * PAN_MAX_SHIFT and abs(d_dec) < view_height * PAN_MAX_SHIFT:
+                self._pan_visible_stars(previous[0], previous[1], d_ra, d_dec, limit)
+                self.visibility_stats['incremental'] += 1
+                return
         
-        ra_diffs = (ras - self.view_ra + 180) % 360 - 180
-        dec_diffs = decs - self.view_dec
+        self._pan_ready = False
+        if isinstance(self.stars, PartitionedCatalog):
+            # Page in only the sky cells under the view
+            cells = self.stars.cells_in_view(self.view_ra, self.view_dec, sky_half_width, sky_half_height)
+            source = self.stars.gather(cells, limit)
+            rows = slice(0, len(source['mag']))
+        elif self.grid is not None and self.grid.coverage(sky_half_width, sky_half_height) < GRID_MAX_COVERAGE:
+            # Gather only the grid cells under the view, then apply the magnitude limit
+            source = self.stars
+            rows = self.grid.query(self.view_ra, self.view_dec, sky_half_width, sky_half_height)
+            rows = rows[source['mag'][rows] <= limit]
+            # Pans from here can patch this set strip by strip (the strips are RA/Dec boxes,
+            # which only holds for the equirectangular projection)
+            self._pan_ready = INCREMENTAL_PAN and self.projection.name == 'equirectangular'
+        else:
+            # Most of the sky is in view: the bright prefix is the cheaper scan
+            source = self.stars
+            rows = slice(0, np.searchsorted(source['mag'], limit, side='right'))
         
-        visible_mask = (np.abs(ra_diffs) < view_width/2) & (np.abs(dec_diffs) < view_height/2)
-        self.visible_stars = self.stars[visible_mask]
-        self.last_view_params = current_view
+        # Exact cull: projected onto the screen and on the visible side of the sphere
+        visible_mask = self._on_screen(source['ra_deg'][rows], source['dec'][rows], self.view_ra, self.view_dec)
+        if isinstance(rows, slice):
+            # Keep a slice (and so zero-copy column views) when the whole prefix is on screen
+            self.visible_index = rows if visible_mask.all() else rows.start + np.flatnonzero(visible_mask)
+        else:
+            self.visible_index = rows[visible_mask]
+        self.visible_source = source
+        self.visibility_stats['full'] += 1
+
+    def _on_screen(self, ras, decs, ra0, dec0):
+        """Mask of sky positions that land on screen for a view centred on (ra0, dec0)"""
+        return self.pool.map(lambda r, d: self._on_screen_chunk(r, d, ra0, dec0), ras, decs)
+
+    def _on_screen_chunk(self, ras, decs, ra0, dec0):
+        x, y, visible = kernels.project(self.projection, ras, decs, ra0, dec0, 1.0 / self._scale,
+                                        self.observer is not None)
+        return visible & (np.abs(x) < WIDTH/2) & (np.abs(y) < HEIGHT/2)
+
+    def _pan_visible_stars(self, old_ra, old_dec, d_ra, d_dec, limit):
+        """Update the visible set after a small pan: drop stars that left, add the entering strips"""
+        ras, decs, mags = self.stars['ra_deg'], self.stars['dec'], self.stars['mag']
+        half_width = WIDTH * self.scale / 2
+        half_height = HEIGHT * self.scale / 2
+        
+        kept = self.visible_index[self._on_screen(ras[self.visible_index], decs[self.visible_index],
+                                                  self.view_ra, self.view_dec)]
+        
+        # Sky strips uncovered by the pan: one along the leading RA edge, one along the Dec edge
+        strips = []
+        if d_ra:
+            ra_centre = self.view_ra + np.sign(d_ra) * (half_width - abs(d_ra) / 2)
+            strips.append(self.grid.query(ra_centre % 360, self.view_dec, abs(d_ra) / 2, half_height))
+        if d_dec:
+            dec_centre = self.view_dec + np.sign(d_dec) * (half_height - abs(d_dec) / 2)
+            strips.append(self.grid.query(self.view_ra, dec_centre, half_width, abs(d_dec) / 2))
+        if strips:
+            rows = np.unique(np.concatenate(strips))
+            rows = rows[mags[rows] <= limit]
+            entering = (self._on_screen(ras[rows], decs[rows], self.view_ra, self.view_dec)
+                        & ~self._on_screen(ras[rows], decs[rows], old_ra, old_dec))
+            kept = np.concatenate((kept, rows[entering]))
+        self.visible_index = kept
 
     def _wrap_ra(self, ras):
         """Handle RA periodicity wrapping"""
@@ -85,13 +211,167 @@ class StarMap:
         return np.where(ras - base_ra > 180, ras - 360,
                       np.where(ras - base_ra < -180, ras + 360, ras))
     
+    def project(self, ras, decs):
+        """Screen coordinates of sky positions plus the projection's visibility mask"""
+        return self.pool.map(self._project_chunk, np.asarray(ras), np.asarray(decs))
+
+    def _project_chunk(self, ras, decs):
+        x, y, visible = kernels.project(self.projection, ras, decs, self._view_ra, self._view_dec,
+                                        1.0 / self._scale, self.observer is not None)
+        return WIDTH / 2 + x, HEIGHT / 2 - y, visible
+
+    def screen_layer(self, layer):
+        """Screen (x, y, visible) of a whole layer for the current view, computed once per view state
+
+        `layer` is 'stars' (the visible set, in visible_stars order), 'asterisms' or
+        'boundaries' (every vertex, in ShapeStore order). A layer is projected the first
+        time it is asked for and then reused until the view, projection or positions change,
+        so layers that are not drawn cost nothing.
+        """
+        self._refresh()
+        key = (self._view_ra, self._view_dec, self._scale, self.projection.name, self.sky_version)
+        if key != self._screen_key:
+            self._screen_key = key
+            self._screen_layers = {}
+        if layer in self._screen_layers:
+            self.screen_stats['hits'] += 1
+            return self._screen_layers[layer]
+        if layer == 'stars':
+            source = self.visible_stars
+            ras, decs = source['ra_deg'], source['dec']
+        elif layer == 'asterisms':
+            ras, decs = self.asterisms.ra, self.asterisms.dec
+        elif layer == 'boundaries':
+            ras, decs = self.constellations.ra, self.constellations.dec
+        else:
+            raise KeyError(layer)
+        self.screen_stats['projections'] += 1
+        self._screen_layers[layer] = self.project(ras, decs)
+        return self._screen_layers[layer]
+
     def convert_coordinates(self, ras, decs):
         """Convert RA and Dec to screen coordinates"""
-        scale_inv = 1.0 / self._scale
-        x = WIDTH / 2 + ((ras - self._view_ra + 180) % 360 - 180) * scale_inv
-        y = HEIGHT / 2 - (decs - self._view_dec) * scale_inv
+        x, y, _ = self.project(ras, decs)
         return x, y
 
+    def screen_to_sky(self, x, y):
+        """Inverse of convert_coordinates, for picking: screen position to RA/Dec in degrees"""
+        return self.projection.inverse((np.asarray(x) - WIDTH / 2) * self._scale,
+                                       (HEIGHT / 2 - np.asarray(y)) * self._scale,
+                                       self._view_ra, self._view_dec)
+
+    def set_epoch(self, epoch):
+        """Show the sky at decimal year `epoch`: proper motion plus precession, cached per epoch"""
+        if isinstance(self.stars, PartitionedCatalog):
+            raise ValueError('Epoch propagation needs the in-memory catalog')
+        if epoch == CATALOG_EPOCH:
+            sky = self._catalog_sky
+        else:
+            if self._epochs is None:
+                stars, asterisms, boundaries, _ = self._catalog_sky
+                self._epochs = EpochCache(stars, asterisms, boundaries, EPOCH_CACHE_SIZE,
+                                          lambda s: SkyGrid(s['ra_deg'], s['dec'], s['mag'], GRID_CELL_DEG))
+            sky = self._epochs.get(epoch)
+        self._sky = sky
+        self.epoch = epoch
+        self._apply_sky()
+
+    def set_observer(self, latitude=None, longitude=None):
+        """Switch to a horizon view for a site on Earth, or back to the RA/Dec chart with no arguments"""
+        if latitude is None:
+            self.observer = None
+            self._apply_sky()
+            self.set_view(ra=self.map_center_ra, dec=self.map_center_dec)
+            return
+        if isinstance(self.stars, PartitionedCatalog):
+            raise ValueError('Horizon mode needs the in-memory catalog')
+        stars, asterisms, boundaries, _ = self._sky
+        self.observer = Observer(latitude, longitude, stars, asterisms, boundaries)
+        self._apply_sky()
+        self.tick()
+        # Face south, a third of the way up the sky
+        self.set_view(ra=180, dec=30)
+
+    def tick(self, unix_time=None):
+        """Advance the horizon view to `unix_time` (now by default); call once per frame"""
+        if self.observer is None:
+            return
+        # Only the stars bright enough to be drawn need transforming
+        count = np.searchsorted(self._sky[0]['mag'], self.limiting_magnitude(), side='right')
+        self.observer.update(unix_time, count)
+        self._positions_moved()
+
+    def _apply_sky(self):
+        """Point the layers at the current epoch's sky, in the horizon frame if an observer is set"""
+        if self.observer is not None:
+            stars, asterisms, boundaries, _ = self._sky
+            if self.observer.source is not stars:
+                self.observer = Observer(self.observer.latitude, self.observer.longitude,
+                                         stars, asterisms, boundaries)
+                self.observer.update()
+            # The spatial grid indexes RA/Dec, so horizon mode culls by magnitude prefix instead
+            self.stars, self.asterisms, self.constellations = (
+                self.observer.stars, self.observer.asterisms, self.observer.boundaries)
+            self.grid = None
+        else:
+            self.stars, self.asterisms, self.constellations, self.grid = self._sky
+        self._positions_moved()
+
+    def _positions_moved(self):
+        """Positions changed under an unchanged view: rebuild the visible set from scratch"""
+        self.sky_version += 1
+        self.last_view_params = None
+        self._pan_ready = False
+        self._view_changed()
+
+    def set_projection(self, name):
+        """Switch the sky projection at runtime"""
+        self.projection = PROJECTIONS[name]
+        self._view_changed()
+
+    def _view_changed(self):
+        """Clamp the view and mark derived state stale, unless inside a batch"""
+        if self._batch_depth:
+            return
+        self._clamp_view()
+        self._view_dirty = True
+
+    @contextmanager
+    def batch(self):
+        """Group several view assignments into one update, applied when the block exits"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            self._view_changed()
+
+    def set_view(self, ra=None, dec=None, scale=None):
+        """Change any of RA, Dec and scale with a single clamp and visibility update"""
+        with self.batch():
+            if scale is not None:
+                self.scale = scale
+            if ra is not None:
+                self.view_ra = ra
+            if dec is not None:
+                self.view_dec = dec
+
+    def _refresh(self):
+        """Bring view-derived state up to date if the view changed"""
+        if self._view_dirty:
+            self._view_dirty = False
+            self._update_visible_stars()
+
+    def view_state(self):
+        """Everything about the view a drawn frame depends on, for change detection"""
+        return (self._view_ra, self._view_dec, self._scale, self.projection.name, self.sky_version)
+
+    @property
+    def visible_stars(self):
+        """Visible stars as a StarView over the catalog columns"""
+        self._refresh()
+        return StarView(self.visible_source, self.visible_index)
+
     @property
     def view_ra(self):
         return self._view_ra
@@ -99,8 +379,7 @@ class StarMap:
     @view_ra.setter
     def view_ra(self, value):
         self._view_ra = value % 360
-        self._clamp_view()
-        self._update_visible_stars()
+        self._view_changed()
 
     @property
     def view_dec(self):
@@ -109,8 +388,7 @@ class StarMap:
     @view_dec.setter
     def view_dec(self, value):
         self._view_dec = value
-        self._clamp_view()
-        self._update_visible_stars()
+        self._view_changed()
 
     @property
     def scale(self):
@@ -119,5 +397,4 @@ class StarMap:
     @scale.setter
     def scale(self, value):
         self._scale = np.clip(value, self.max_scale, self.min_scale)
-        self._clamp_view()
-        self._update_visible_stars()
\ No newline at end of file
+        self._view_changed()
@@ -0,0 +1,29 @@
+import numpy as np
+
+# (minimum temperature in K, RGB) from hottest to coolest; anything cooler is reddish
+TEMPERATURE_COLORS = (
+    (10000, (155, 176, 255)),  # Bluish
+    (7500, (170, 190, 255)),   # Soft blue
+    (6000, (255, 255, 255)),   # White
+    (5000, (255, 244, 214)),   # Warm white
+)
+COOL_COLOR = (255, 204, 111)  # Reddish
+
+
+def star_colors(ci):
+    """RGB colour of every star from its B-V colour index, as an (n, 3) uint8 array"""
+    ci = np.asarray(ci, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Using an approximate formula to compute temperature from color index.
+        temperature = 4600 * (1/(0.92 * ci + 1.7) + 1/(0.92 * ci + 0.62))
+    colors = np.empty((len(ci), 3), dtype=np.uint8)
+    colors[:] = COOL_COLOR
+    # Paint coolest to hottest so the hottest matching class wins
+    for threshold, color in reversed(TEMPERATURE_COLORS):
+        colors[temperature >= threshold] = color
+    return colors
+
+
+def star_radii(mag):
+    """Base disc radius in pixels; brighter stars (lower mag) appear larger"""
+    return np.maximum(1, (6 - np.asarray(mag)).astype(int)).astype(np.uint8)
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from config import STARTUP_BUDGET_MS
+
+
+class StartupTrace:
+    """Wall-clock timings of import and initialisation phases up to the first frame
+
+    Enabled with `--trace-startup` on the command line or STARLINK_TRACE_STARTUP=1.
+    """
+    def __init__(self, enabled, budget_ms=STARTUP_BUDGET_MS):
+        self.enabled = enabled
+        self.budget_ms = budget_ms
+        self.start = time.perf_counter()
+        self.phases = []
+        self.depth = 0
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        entry = [name, self.depth, 0.0]
+        self.phases.append(entry)
+        self.depth += 1
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry[2] = time.perf_counter() - begin
+            self.depth -= 1
+
+    def first_frame(self):
+        """Print the report once, when the first frame has been presented"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        total_ms = (time.perf_counter() - self.start) * 1000
+        print('Startup trace:')
+        for name, depth, seconds in self.phases:
+            print(f"  {'  ' * depth}{name:<{40 - 2 * depth}} {seconds * 1000:8.1f} ms")
+        status = 'within' if total_ms <= self.budget_ms else 'OVER'
+        print(f"  {'time to first frame':<40} {total_ms:8.1f} ms ({status} {self.budget_ms} ms budget)")
+
+
+def _env_flag(name):
+    """True when environment variable `name` is set to something other than empty, 0, false or no"""
+    return os.environ.get(name, '').strip().lower() not in ('', '0', 'false', 'no')
+
+
+startup_trace = StartupTrace('--trace-startup' in sys.argv or _env_flag('STARLINK_TRACE_STARTUP'))
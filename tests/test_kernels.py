@@ -0,0 +1,116 @@
+"""The compiled kernels must agree with their NumPy implementations.
+
+Every test runs the loops Numba compiles as plain Python (same float64 maths, so
+it works without Numba installed), and compiled as well when Numba is available.
+"""
+import numpy as np
+import pytest
+
+import kernels
+from projection import PROJECTIONS
+
+
+@pytest.fixture(params=['loops', 'numba'])
+def compiled(request, monkeypatch):
+    """Make jit=True dispatch to the Python loops, or to the real Numba kernels"""
+    if request.param == 'loops':
+        monkeypatch.setattr(kernels, 'HAVE_NUMBA', True)
+        monkeypatch.setattr(kernels, '_call_compiled', lambda loop, *args: loop(*args))
+    elif not kernels.HAVE_NUMBA:
+        pytest.skip('Numba is not installed')
+    return request.param
+
+
+def sky(n, seed=0):
+    """Uniform RA/Dec as float32, like the catalog columns"""
+    rng = np.random.default_rng(seed)
+    ras = rng.uniform(0, 360, n).astype(np.float32)
+    decs = np.degrees(np.arcsin(rng.uniform(-1, 1, n))).astype(np.float32)
+    return ras, decs
+
+
+def near_cull_edge(projection, ras, decs, ra0, dec0, horizon):
+    """Points whose visibility float32 rounding could flip: on the cull boundary or the horizon"""
+    ra, dec = np.radians(ras.astype(np.float64)), np.radians(decs.astype(np.float64))
+    d0 = np.radians(dec0)
+    cos_c = np.sin(d0) * np.sin(dec) + np.cos(d0) * np.cos(dec) * np.cos(ra - np.radians(ra0))
+    edge = np.abs(cos_c - getattr(projection, 'min_cos', -2.0)) < 1e-5
+    if horizon:
+        edge |= np.abs(decs) < 1e-4
+    return edge
+
+
+@pytest.mark.parametrize('horizon', [False, True], ids=['sky', 'horizon'])
+@pytest.mark.parametrize('name', list(PROJECTIONS))
+@pytest.mark.parametrize('scale_inv', [1.0, 1 / 0.012])
+def test_project_matches_numpy(compiled, name, horizon, scale_inv):
+    projection = PROJECTIONS[name]
+    ras, decs = sky(4000)
+    args = (projection, ras, decs, 123.4, -20.5, scale_inv, horizon)
+    x0, y0, visible0 = kernels.project(*args, jit=False)
+    x1, y1, visible1 = kernels.project(*args, jit=True)
+
+    settled = ~near_cull_edge(projection, ras, decs, 123.4, -20.5, horizon)
+    np.testing.assert_array_equal(visible1[settled], visible0[settled])
+    # Culled points only need finite positions; compare the rest to float32 precision
+    tolerance = dict(rtol=kernels.PROJECT_RTOL, atol=kernels.PROJECT_ATOL_DEG * scale_inv)
+    shown = visible0 & visible1
+    np.testing.assert_allclose(x1[shown], x0[shown], **tolerance)
+    np.testing.assert_allclose(y1[shown], y0[shown], **tolerance)
+    assert np.isfinite(x1).all() and np.isfinite(y1).all()
+
+
+def polylines(seed=1, shapes=3000):
+    rng = np.random.default_rng(seed)
+    lengths = 2 * rng.integers(0, 6, shapes)
+    lengths[::7] = 0  # Empty shapes share their offset with the next one
+    x = rng.uniform(0, 1600, lengths.sum())
+    visible = rng.random(lengths.sum()) < 0.85
+    return x, visible, np.r_[0, np.cumsum(lengths)]
+
+
+@pytest.mark.parametrize('pairs', [False, True], ids=['polylines', 'pairs'])
+def test_split_runs_matches_numpy(compiled, pairs):
+    x, visible, offsets = polylines()
+    starts0, ends0 = kernels.split_runs(x, visible, offsets, 960, pairs=pairs, jit=False)
+    starts1, ends1 = kernels.split_runs(x, visible, offsets, 960, pairs=pairs, jit=True)
+    np.testing.assert_array_equal(starts1, starts0)
+    np.testing.assert_array_equal(ends1, ends0)
+    assert len(starts0) > 0
+
+
+def test_split_runs_pairs_start_on_a_pair():
+    x, visible, offsets = polylines(seed=2)
+    starts, ends = kernels.split_runs(x, visible, offsets, 960, pairs=True, jit=False)
+    shape_starts = offsets[np.searchsorted(offsets, starts, side='right') - 1]
+    assert ((starts - shape_starts) % 2 == 0).all()
+    assert (ends - starts >= 2).all()
+
+
+def test_splat_matches_numpy(compiled):
+    rng = np.random.default_rng(3)
+    n = 400
+    stars = (rng.integers(-5, 125, n), rng.integers(-5, 85, n), rng.integers(0, 6, n),
+             rng.integers(0, 256, (n, 3)), rng.uniform(0.1, 1, n))
+    base = rng.integers(0, 200, (120, 80, 3)).astype(np.uint8)
+    pixels0, pixels1 = base.copy(), base.copy()
+    kernels.splat(pixels0, *stars, jit=False)
+    kernels.splat(pixels1, *stars, jit=True)
+    np.testing.assert_array_equal(pixels1, pixels0)
+    assert (pixels0 == 255).any()  # Overlaps saturated somewhere
+
+
+def test_splat_numpy_on_surface_pixels():
+    """surfarray.pixels3d views are strided with a reversed channel axis; the result must not depend on it"""
+    pygame = pytest.importorskip('pygame')
+    rng = np.random.default_rng(4)
+    n = 300
+    stars = (rng.integers(-5, 125, n), rng.integers(-5, 85, n), rng.integers(0, 6, n),
+             rng.integers(0, 256, (n, 3)), rng.uniform(0.1, 1, n))
+    surface = pygame.Surface((120, 80))
+    surface.fill((40, 90, 200))
+    pixels = pygame.surfarray.pixels3d(surface)
+    expected = np.ascontiguousarray(pixels)
+    kernels.splat(expected, *stars, jit=False)
+    kernels.splat(pixels, *stars, jit=False)
+    np.testing.assert_array_equal(pixels, expected)